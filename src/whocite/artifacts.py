@@ -0,0 +1,88 @@
+import gzip
+import json
+import os
+
+from .config import config
+
+# Intermediate files passed between pipeline steps: gzip-compressed JSON
+# Lines, one record per line, so readers can stream them record by record
+CITATIONS_FILE = "citations.jsonl.gz"  # one line per paper in my.bib
+AUTHORS_FILE = "authors.jsonl.gz"  # one line per author profile
+# Uncompressed files written by earlier versions, still read when present
+LEGACY_CITATIONS_FILE = "citations.json"
+LEGACY_AUTHORS_FILE = "authors.json"
+COMPRESSLEVEL = 6
+
+
+def _dumps(record):
+    return json.dumps(record, separators=(",", ":"), ensure_ascii=False)
+
+
+def write_jsonl(path, records):
+    """Replaces `path` with the records; readers never see a half-written file."""
+    tmp = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=COMPRESSLEVEL) as f:
+        for record in records:
+            f.write(_dumps(record) + "\n")
+    os.replace(tmp, path)
+
+
+def append_jsonl(path, record):
+    """Appends one record as its own gzip member, so earlier records survive an interrupted run."""
+    with gzip.open(path, "at", encoding="utf-8", compresslevel=COMPRESSLEVEL) as f:
+        f.write(_dumps(record) + "\n")
+
+
+def iter_jsonl(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def citations_path():
+    return config.OUTPUT_DIR / CITATIONS_FILE
+
+
+def authors_path():
+    return config.OUTPUT_DIR / AUTHORS_FILE
+
+
+def _load_legacy(filename):
+    with open(config.OUTPUT_DIR / filename, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_citations():
+    """
+    Returns an iterator over the {"my_paper", "citations"} entries, read one
+    paper at a time. Raises FileNotFoundError when step 1 has not run yet.
+    """
+    path = citations_path()
+    if path.exists():
+        return iter_jsonl(path)
+    return iter(_load_legacy(LEGACY_CITATIONS_FILE))
+
+
+def save_citations(entries):
+    write_jsonl(citations_path(), entries)
+
+
+def load_authors(fields=None):
+    """
+    Returns {authorId: profile}. With `fields`, each profile keeps only those
+    keys, so callers that need a few columns do not hold every profile whole.
+    Raises FileNotFoundError when step 2 has not run yet.
+    """
+    path = authors_path()
+    if path.exists():
+        profiles = ((profile["authorId"], profile) for profile in iter_jsonl(path))
+    else:
+        profiles = _load_legacy(LEGACY_AUTHORS_FILE).items()
+    if fields:
+        return {a_id: {k: profile[k] for k in fields if k in profile} for a_id, profile in profiles}
+    return dict(profiles)
+
+
+def save_authors(author_map):
+    write_jsonl(authors_path(), author_map.values())
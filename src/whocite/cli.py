@@ -1,10 +1,7 @@
 import click
-from .step1_fetch_citations import main as fetch_citations
-from .step2_fetch_author_details import main as fetch_details
-from .step3_analyze_results import main as analyze
-from .step4_filter_authors import main as filter_authors
-from .step5_research_authors import main as research
-from .step6_merge_results import main as merge
+
+# Step modules are imported inside each command so that `whocite --help` and
+# the cheap local steps do not pay for requests, bibtexparser or LLM SDKs.
 
 @click.group()
 def cli():
@@ -14,50 +11,187 @@ def cli():
 @cli.command(name="fetch-citations")
 def cmd_fetch_citations():
     """Fetch citations for papers in my.bib"""
+    from .step1_fetch_citations import main as fetch_citations
     fetch_citations()
 
 @cli.command(name="fetch-authors")
-def cmd_fetch_authors():
+@click.option("--only-missing", is_flag=True, help="Keep known author profiles and fetch only new author IDs")
+def cmd_fetch_authors(only_missing):
     """Fetch author details from Semantic Scholar"""
-    fetch_details()
+    from .step2_fetch_author_details import main as fetch_details
+    fetch_details(only_missing=only_missing)
 
 @cli.command(name="analyze")
-def cmd_analyze():
+@click.option("--workers", default=1, show_default=True, type=click.IntRange(min=0), help="Worker processes (0: one per CPU core)")
+def cmd_analyze(workers):
     """Analyze results and generate CSV"""
-    analyze()
+    from .step3_analyze_results import main as analyze
+    analyze(workers=workers)
 
 @cli.command(name="filter")
-def cmd_filter():
+@click.option("--workers", default=1, show_default=True, type=click.IntRange(min=0), help="Worker processes (0: one per CPU core)")
+def cmd_filter(workers):
     """Filter high-impact authors"""
-    filter_authors()
+    from .step4_filter_authors import main as filter_authors
+    filter_authors(workers=workers)
+
+@cli.command(name="network")
+def cmd_network():
+    """Write co-authorship clusters and centrality per citing author"""
+    from .network import main as network
+    network()
+
+@cli.command(name="contexts")
+def cmd_contexts():
+    """Summarize how papers are cited: intents, context sentences, sentiment"""
+    from .contexts import main as contexts
+    contexts()
 
 @cli.command(name="research")
-@click.option("--limit", default=None, type=int, help="Limit number of authors to research")
-def cmd_research(limit):
-    """Research authors using Google GenAI"""
-    research(limit=limit)
+@click.option("--limit", default=None, type=int, help="Research at most this many authors, most valuable first")
+@click.option("--backend", default="gemini", show_default=True, help="[llm.<name>] config section to research with, or 'fake'")
+@click.option("--batch", is_flag=True, help="Use the provider's batch API when the backend has one")
+@click.option("--max-input-tokens", default=None, type=int, help="Input token budget (defaults to max_input_tokens in config)")
+@click.option("--max-cost", default=None, type=float, help="Cost budget; needs *_cost_per_million prices in config")
+@click.option("--max-retries", default=1, show_default=True, type=int, help="Re-ask authors whose output failed validation")
+@click.option("--only-new", is_flag=True, help="Keep successful results from the last run and research only new authors")
+@click.option("--max-age", "max_age_days", default=180, show_default=True, type=int,
+              help="Reuse successful research younger than this many days")
+@click.option("--trust-affiliations", is_flag=True, help="Skip authors whose Semantic Scholar affiliation is known")
+def cmd_research(limit, backend, batch, max_input_tokens, max_cost, max_retries, only_new, max_age_days,
+                 trust_affiliations):
+    """Research authors using an LLM backend"""
+    from .step5_research_authors import main as research
+    research(limit=limit, backend=backend, batch=batch, max_input_tokens=max_input_tokens,
+             max_cost=max_cost, max_retries=max_retries, only_new=only_new, max_age_days=max_age_days,
+             trust_affiliations=trust_affiliations)
 
 @cli.command(name="merge")
 def cmd_merge():
     """Merge research results into main CSV"""
+    from .step6_merge_results import main as merge
     merge()
 
+@cli.command(name="retry")
+@click.option("--kind", "kinds", multiple=True, type=click.Choice(["citations", "authors", "research"]),
+              help="Only retry this kind of unit (repeatable)")
+@click.option("--max-attempts", default=3, show_default=True, type=int, help="Attempts per unit")
+@click.option("--backoff", default=2.0, show_default=True, type=float, help="Initial delay in seconds, doubled per attempt")
+def cmd_retry(kinds, max_attempts, backoff):
+    """Re-run only the units of work that failed earlier"""
+    from .retry_queue import main as retry
+    retry(kinds=kinds, max_attempts=max_attempts, base_delay=backoff)
+
+@cli.command(name="export")
+@click.option("--format", "fmt", default="csv.gz", show_default=True, type=click.Choice(["csv", "csv.gz", "parquet"]), help="Export format")
+@click.option("--workers", default=None, type=click.IntRange(min=1), help="Worker processes (default: one per report)")
+def cmd_export(fmt, workers):
+    """Export final reports to output/exports in parallel"""
+    from .export import export_reports
+    try:
+        export_reports(fmt=fmt, workers=workers)
+    except ImportError as e:
+        click.echo(f"Error: {e}")
+
+@cli.command(name="watch")
+@click.option("--interval", default=60, show_default=True, type=int, help="Minutes between citation polls")
+@click.option("--bib-poll", default=30, show_default=True, type=int, help="Seconds between checks of my.bib for changes")
+@click.option("--research", is_flag=True, help="Also research new high-impact authors after each change")
+@click.option("--research-backend", default="gemini", show_default=True, help="[llm.<name>] config section for research")
+@click.option("--max-papers", default=None, type=int, help="Refetch at most this many changed papers per cycle")
+@click.option("--once", is_flag=True, help="Run a single cycle and exit")
+def cmd_watch(interval, bib_poll, research, research_backend, max_papers, once):
+    """Keep citation data fresh, rerunning only the steps that need it"""
+    from .watch import watch
+    watch(interval=interval, bib_poll=bib_poll, research=research, backend=research_backend,
+          max_papers=max_papers, once=once)
+
+@cli.command(name="query")
+@click.option("--author", default=None, help="Words of the citing author's name")
+@click.option("--institution", default=None, help="Words of the citing author's affiliation")
+@click.option("--paper", default=None, help="DOI or title words of one of your papers")
+@click.option("--year", default=None, help="Citing year, or a range like 2020-2024")
+@click.option("--venue", default=None, help="Words of the citing venue")
+@click.option("--authors", "distinct_authors", is_flag=True, help="List distinct authors instead of citation rows")
+@click.option("--page", default=1, show_default=True, type=int)
+@click.option("--per-page", default=20, show_default=True, type=int)
+@click.option("--json", "as_json", is_flag=True, help="Print raw JSON")
+def cmd_query(author, institution, paper, year, venue, distinct_authors, page, per_page, as_json):
+    """Query the processed citation data"""
+    import json
+    import sqlite3
+    from contextlib import closing
+    from .query import connect, query
+    try:
+        with closing(connect()) as conn:
+            result = query(conn, author=author, institution=institution, paper=paper, year=year, venue=venue,
+                           page=page, per_page=per_page, distinct_authors=distinct_authors)
+    except FileNotFoundError as e:
+        click.echo(f"Error: {e}")
+        return
+    except (ValueError, sqlite3.OperationalError) as e:
+        # Bad filter values (--year abc) or search syntax FTS5 cannot parse
+        raise click.BadParameter(str(e))
+    if as_json:
+        click.echo(json.dumps(result, indent=2))
+        return
+    for row in result["results"]:
+        if distinct_authors:
+            click.echo(f"{row['Citing Author Name']} ({row['Citing Author Affiliation'] or 'unknown'}) - {row['citations']} citations")
+        else:
+            click.echo(f"{row['Citing Author Name']} ({row['Citing Author Affiliation'] or 'unknown'}): "
+                       f"{row['Citing Paper Title']} [{row['Citing Paper Year']}, {row['Citing Paper Venue']}] "
+                       f"-> {row['My Paper Title']}")
+    shown = len(result["results"])
+    first = (result["page"] - 1) * result["per_page"]
+    click.echo(f"\n{first + 1 if shown else 0}-{first + shown} of {result['total']}")
+
+@cli.command(name="api")
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8765, show_default=True, type=int)
+def cmd_api(host, port):
+    """Serve read-only citation queries over HTTP"""
+    from .query import serve
+    serve(host=host, port=port)
+
 @cli.command(name="run-all")
 @click.option("--limit-research", default=None, type=int, help="Limit for research step")
-def cmd_run_all(limit_research):
+@click.option("--research-backend", default="gemini", show_default=True, help="[llm.<name>] config section for the research step")
+@click.option("--workers", default=1, show_default=True, type=click.IntRange(min=0), help="Analyze/filter worker processes (0: one per CPU core)")
+@click.option("--sample", default=None, type=click.FloatRange(0, 1, min_open=True),
+              help="Preview: run on this fraction of the papers and estimate the full run")
+def cmd_run_all(limit_research, research_backend, workers, sample):
     """Run the entire pipeline"""
+    if sample:
+        from .sample import run_sample
+        run_sample(sample, backend=research_backend, workers=workers, research_limit=limit_research)
+        return
+
+    from .sample import estimate_path
+    from .step1_fetch_citations import main as fetch_citations
+    from .step2_fetch_author_details import main as fetch_details
+    from .step3_analyze_results import main as analyze
+    from .step4_filter_authors import main as filter_authors
+    from .step5_research_authors import main as research
+    from .step6_merge_results import main as merge
+
+    # After a `--sample` preview, its citations and author profiles are kept
+    # instead of fetched again; research reuses fresh results on its own
+    sampled = estimate_path().exists()
     click.echo("Step 1: Fetching Citations...")
-    fetch_citations()
+    fetch_citations(reuse_existing=sampled)
     click.echo("\nStep 2: Fetching Author Details...")
-    fetch_details()
+    fetch_details(only_missing=sampled)
     click.echo("\nStep 3: Analyzing Results...")
-    analyze()
+    analyze(workers=workers)
     click.echo("\nStep 4: Filtering Authors...")
-    filter_authors()
+    filter_authors(workers=workers)
     click.echo("\nStep 5: Researching Authors...")
-    research(limit=limit_research)
+    research(limit=limit_research, backend=research_backend)
     click.echo("\nStep 6: Merging Results...")
     merge()
+    if sampled:
+        estimate_path().unlink()
     click.echo("\nPipeline Complete!")
 
 if __name__ == "__main__":
@@ -1,9 +1,37 @@
+from __future__ import annotations
+
 import threading
 import tomllib
+from functools import cache
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from .settings import (
+        AppConfig,
+        BrowserSettings,
+        LLMSettings,
+        ProxySettings,
+        SandboxSettings,
+        SearchSettings,
+    )
+
+_SETTINGS_MODELS = {
+    "AppConfig",
+    "BrowserSettings",
+    "LLMSettings",
+    "ProxySettings",
+    "SandboxSettings",
+    "SearchSettings",
+}
 
-from pydantic import BaseModel, Field
+
+def __getattr__(name):
+    # Re-export the settings models without importing pydantic up front
+    if name in _SETTINGS_MODELS:
+        from . import settings
+        return getattr(settings, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_project_root() -> Path:
@@ -16,100 +44,12 @@ WORKSPACE_ROOT = PROJECT_ROOT / "workspace"
 CONFIG_DIR = PROJECT_ROOT / "config"
 OUTPUT_DIR = PROJECT_ROOT / "output"
 
-# Ensure output directory exists
-OUTPUT_DIR.mkdir(exist_ok=True)
-
-
-class LLMSettings(BaseModel):
-    model: str = Field(..., description="Model name")
-    base_url: str = Field(..., description="API base URL")
-    api_key: str = Field(..., description="API key")
-    max_tokens: int = Field(4096, description="Maximum number of tokens per request")
-    max_completion_tokens: int = Field(4096, description="Maximum number of tokens per request for reasoning models")
-    max_input_tokens: Optional[int] = Field(
-        None,
-        description="Maximum input tokens to use across all requests (None for unlimited)",
-    )
-    temperature: float = Field(1.0, description="Sampling temperature")
-    api_type: str = Field(..., description="Azure, Openai, or Ollama")
-    api_version: str = Field(..., description="Azure Openai version if AzureOpenai")
-
-
-class ProxySettings(BaseModel):
-    server: str = Field(None, description="Proxy server address")
-    username: Optional[str] = Field(None, description="Proxy username")
-    password: Optional[str] = Field(None, description="Proxy password")
-
-
-class SearchSettings(BaseModel):
-    engine: str = Field(default="Google", description="Search engine the llm to use")
-    fallback_engines: List[str] = Field(
-        default_factory=lambda: ["DuckDuckGo", "Baidu"],
-        description="Fallback search engines to try if the primary engine fails",
-    )
-    retry_delay: int = Field(
-        default=60,
-        description="Seconds to wait before retrying all engines again after they all fail",
-    )
-    max_retries: int = Field(
-        default=3,
-        description="Maximum number of times to retry all engines when all fail",
-    )
-
-
-class BrowserSettings(BaseModel):
-    headless: bool = Field(False, description="Whether to run browser in headless mode")
-    disable_security: bool = Field(
-        True, description="Disable browser security features"
-    )
-    extra_chromium_args: List[str] = Field(
-        default_factory=list, description="Extra arguments to pass to the browser"
-    )
-    chrome_instance_path: Optional[str] = Field(
-        None, description="Path to a Chrome instance to use"
-    )
-    wss_url: Optional[str] = Field(
-        None, description="Connect to a browser instance via WebSocket"
-    )
-    cdp_url: Optional[str] = Field(
-        None, description="Connect to a browser instance via CDP"
-    )
-    proxy: Optional[ProxySettings] = Field(
-        None, description="Proxy settings for the browser"
-    )
-    max_content_length: int = Field(
-        2000, description="Maximum length for content retrieval operations"
-    )
-
 
-class SandboxSettings(BaseModel):
-    """Configuration for the execution sandbox"""
-
-    use_sandbox: bool = Field(False, description="Whether to use the sandbox")
-    image: str = Field("python:3.12-slim", description="Base image")
-    work_dir: str = Field("/workspace", description="Container working directory")
-    memory_limit: str = Field("512m", description="Memory limit")
-    cpu_limit: float = Field(1.0, description="CPU limit")
-    timeout: int = Field(300, description="Default command timeout (seconds)")
-    network_enabled: bool = Field(
-        False, description="Whether network access is allowed"
-    )
-
-
-class AppConfig(BaseModel):
-    llm: Dict[str, LLMSettings]
-    sandbox: Optional[SandboxSettings] = Field(
-        None, description="Sandbox configuration"
-    )
-    browser_config: Optional[BrowserSettings] = Field(
-        None, description="Browser configuration"
-    )
-    search_config: Optional[SearchSettings] = Field(
-        None, description="Search configuration"
-    )
-
-    class Config:
-        arbitrary_types_allowed = True
+@cache
+def get_output_dir() -> Path:
+    """Get the output directory, creating it on first use"""
+    OUTPUT_DIR.mkdir(exist_ok=True)
+    return OUTPUT_DIR
 
 
 class Config:
@@ -149,6 +89,14 @@ class Config:
             return tomllib.load(f)
 
     def _load_initial_config(self):
+        from .settings import (
+            AppConfig,
+            BrowserSettings,
+            ProxySettings,
+            SandboxSettings,
+            SearchSettings,
+        )
+
         raw_config = self._load_config()
         base_llm = raw_config.get("llm", {})
         llm_overrides = {
@@ -165,6 +113,9 @@ class Config:
             "temperature": base_llm.get("temperature", 1.0),
             "api_type": base_llm.get("api_type", ""),
             "api_version": base_llm.get("api_version", ""),
+            "input_cost_per_million": base_llm.get("input_cost_per_million"),
+            "output_cost_per_million": base_llm.get("output_cost_per_million"),
+            "max_concurrency": base_llm.get("max_concurrency"),
         }
 
         # handle browser config.
@@ -252,4 +203,25 @@ class Config:
         return PROJECT_ROOT
 
 
-config = Config()
+class _LazyConfig:
+    """Proxy for the Config singleton that defers loading config.toml.
+
+    Path attributes (PROJECT_ROOT, CONFIG_DIR, OUTPUT_DIR, ...) are served
+    without touching the TOML file, so steps that only read and write
+    output files never pay for parsing and validating the settings.
+    """
+
+    _paths = {
+        "PROJECT_ROOT": lambda: PROJECT_ROOT,
+        "WORKSPACE_ROOT": lambda: WORKSPACE_ROOT,
+        "CONFIG_DIR": lambda: CONFIG_DIR,
+        "OUTPUT_DIR": get_output_dir,
+    }
+
+    def __getattr__(self, name):
+        if name in self._paths:
+            return self._paths[name]()
+        return getattr(Config(), name)
+
+
+config = _LazyConfig()
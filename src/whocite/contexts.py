@@ -0,0 +1,268 @@
+import heapq
+import math
+import re
+from collections import Counter
+
+from .artifacts import iter_citations, load_authors
+from .config import config
+from .export import write_rows
+
+EDGES_FILE = "citation_contexts.csv"
+AUTHORS_FILE = "author_citation_contexts.csv"
+# Citation intents as labelled by Semantic Scholar
+INTENTS = ["methodology", "background", "result"]
+EDGE_KEYWORDS = 3
+AUTHOR_KEYWORDS = 5
+
+# Cue phrases for how a sentence treats the work it cites
+POSITIVE_CUES = [
+    "accurate", "advance", "advances", "achieves?", "effective(?:ly)?", "efficient(?:ly)?", "elegant",
+    "excellent", "good", "improves?", "improved", "impressive", "influential", "insightful", "novel",
+    "outperforms?", "powerful", "promising", "robust", "seminal", "state-of-the-art", "strong",
+    "success(?:ful|fully)?", "superior", "useful", "valuable", "well-known", "widely used",
+]
+NEGATIVE_CUES = [
+    "cannot", "costly", "does not", "drawbacks?", "expensive", "fails?", "failed", "flawed",
+    "however", "inaccurate", "ineffective", "inefficient", "insufficient", "lacks?", "limitations?",
+    "limited", "poor(?:ly)?", "problematic", "restrictive", "suffers?", "unable", "unclear",
+    "unfortunately", "unlike", "weak(?:ness|nesses)?", "worse",
+]
+STOPWORDS = frozenset("""
+    about above after again against also among and another any are because been before being between
+    both but can could did does doing done each et etc for from further had has have having here how
+    into its itself just like may might more most much must not now only other our ours over same
+    see several should since some such than that the their them then there these they this those
+    through thus too under until upon using very via was were what when where which while who whom
+    why will with within without would yet al fig table section paper papers work works approach however
+    approaches method methods propose proposed based use used shown show shows study studies recent
+""".split())
+
+_CUES = re.compile(
+    r"\b(?:(?P<positive>" + "|".join(POSITIVE_CUES) + r")|(?P<negative>" + "|".join(NEGATIVE_CUES) + r"))\b"
+)
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+(?=[A-Z\[(])")
+# A period after these ends an abbreviation, not a sentence ("Smith et al. (2020)")
+_ABBREVIATION = re.compile(r"\b(?:et al|e\.g|i\.e|cf|fig|figs|eq|eqs|sec|ref|refs|vs)\.$", re.IGNORECASE)
+# Numeric ([12], [3-5]) and author-year ((Smith et al., 2020)) citation markers
+_MARKER = re.compile(r"\[\s*\d[\d,\s–-]*\]|\([^()]*\b(?:19|20)\d\d[a-z]?\)|\bet al\b")
+_WORD = re.compile(r"[a-z][a-z0-9-]{2,}")
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def citation_sentence(context):
+    """
+    The sentence of a citation context that carries the citation marker.
+    Contexts are short excerpts, so without a marker the whole excerpt is kept.
+    """
+    context = " ".join(context.split())
+    sentences = []
+    for fragment in _SENTENCE_BREAK.split(context):
+        if sentences and _ABBREVIATION.search(sentences[-1]):
+            sentences[-1] += " " + fragment
+        else:
+            sentences.append(fragment)
+    for sentence in sentences:
+        if _MARKER.search(sentence):
+            return sentence
+    return context
+
+
+def normalize_sentence(sentence):
+    """Dedup key: lowercase words with citation markers removed."""
+    return " ".join(_TOKEN.findall(_MARKER.sub(" ", sentence.lower())))
+
+
+def sentiment(text):
+    """Cue-based polarity in [-1, 1] of lowercase text; 0 when it has no cues."""
+    positive = negative = 0
+    for match in _CUES.finditer(text):
+        if match.lastgroup == "positive":
+            positive += 1
+        else:
+            negative += 1
+    total = positive + negative
+    return (positive - negative) / total if total else 0.0
+
+
+class SentenceTable:
+    """
+    Every distinct citation sentence once, with its polarity and terms.
+    Edges and authors refer to sentences by index, so a sentence quoted in
+    several edges is scored once and counted once per author.
+    """
+
+    def __init__(self):
+        self._index = {}
+        self._contexts = {}
+        self._weights = None
+        self.sentences = []
+        self.scores = []
+        self.terms = []
+        self.document_frequency = {}
+
+    def add_context(self, context):
+        """Index of the citation sentence in a raw context, or None when it has no words."""
+        # The same excerpt recurs whenever one sentence cites several of our papers
+        if context in self._contexts:
+            return self._contexts[context]
+        i = self._contexts[context] = self.add(citation_sentence(context))
+        return i
+
+    def add(self, sentence):
+        lowered = sentence.lower()
+        text = _MARKER.sub(" ", lowered)
+        # Same key as normalize_sentence(), reusing the lowercase, marker-free text
+        key = " ".join(_TOKEN.findall(text))
+        if not key:
+            return None
+        i = self._index.get(key)
+        if i is None:
+            i = self._index[key] = len(self.sentences)
+            self.sentences.append(sentence)
+            self.scores.append(sentiment(lowered))
+            counts = {}
+            for term in _WORD.findall(text):
+                if term not in STOPWORDS:
+                    counts[term] = counts.get(term, 0) + 1
+            self.terms.append(counts)
+            df = self.document_frequency
+            for term in counts:
+                df[term] = df.get(term, 0) + 1
+        return i
+
+    def keywords(self, ids, count):
+        """Top terms of a group of sentences by TF-IDF against all sentences."""
+        if self._weights is None:
+            # TF-IDF per sentence, computed once after every sentence is known
+            total = len(self.sentences)
+            idf = {term: math.log(total / df) for term, df in self.document_frequency.items()}
+            self._weights = [
+                {term: tf * idf[term] for term, tf in counts.items()} for counts in self.terms
+            ]
+        if len(ids) == 1:
+            weights = self._weights[ids[0]]
+        else:
+            weights = {}
+            for i in ids:
+                for term, weight in self._weights[i].items():
+                    weights[term] = weights.get(term, 0.0) + weight
+        ranked = heapq.nsmallest(count, weights.items(), key=lambda item: (-item[1], item[0]))
+        return [term for term, weight in ranked if weight > 0]
+
+    def mean_score(self, ids):
+        return round(sum(self.scores[i] for i in ids) / len(ids), 3) if ids else ""
+
+
+def collect(citations_data):
+    """
+    One pass over the citation data. Returns (table, edges, authors): an
+    edge per (our paper, citing paper), and per-author aggregates keyed by
+    Semantic Scholar author ID (or name when the ID is missing).
+    """
+    table = SentenceTable()
+    edges = []
+    authors = {}
+    for entry in citations_data:
+        my_paper = entry.get("my_paper", {})
+        for citation in entry.get("citations", []):
+            citing = citation.get("citingPaper") or {}
+            if not citing:
+                continue
+            # dict keeps first-seen order while dropping repeats within the edge
+            ids = list(dict.fromkeys(table.add_context(c) for c in citation.get("contexts") or [] if c))
+            if None in ids:
+                ids.remove(None)
+            intents = [intent for intent in citation.get("intents") or [] if intent]
+            influential = bool(citation.get("isInfluential"))
+            edges.append({
+                "my_paper": my_paper,
+                "citing": citing,
+                "intents": intents,
+                "influential": influential,
+                "sentences": ids,
+            })
+            for author in citing.get("authors", []):
+                key = author.get("authorId") or author.get("name")
+                if not key:
+                    continue
+                stats = authors.get(key)
+                if stats is None:
+                    stats = authors[key] = {
+                        "id": author.get("authorId") or "", "name": author.get("name") or "",
+                        "citations": 0, "influential": 0, "intents": {}, "sentences": {},
+                    }
+                stats["citations"] += 1
+                stats["influential"] += influential
+                for intent in intents:
+                    stats["intents"][intent] = stats["intents"].get(intent, 0) + 1
+                for i in ids:
+                    stats["sentences"][i] = None
+    return table, edges, authors
+
+
+def iter_edge_rows(table, edges):
+    for edge in edges:
+        citing = edge["citing"]
+        ids = edge["sentences"]
+        yield {
+            "My Paper DOI": edge["my_paper"].get("doi", ""),
+            "My Paper Title": edge["my_paper"].get("title", "Unknown Title"),
+            "Citing Paper Title": citing.get("title", "Unknown Title"),
+            "Citing Paper Year": citing.get("year", ""),
+            "Citing Authors": "; ".join(a.get("name") or "" for a in citing.get("authors", [])),
+            "Intents": "; ".join(edge["intents"]),
+            "Influential": edge["influential"],
+            "Contexts": " | ".join(table.sentences[i] for i in ids),
+            "Sentiment": table.mean_score(ids),
+            "Keywords": "; ".join(table.keywords(ids, EDGE_KEYWORDS)),
+        }
+
+
+def iter_author_rows(table, authors, profiles):
+    ranked = sorted(authors.items(), key=lambda item: (-item[1]["citations"], -item[1]["influential"]))
+    for _, stats in ranked:
+        ids = list(stats["sentences"])
+        row = {
+            "Author ID": stats["id"],
+            "Author Name": stats["name"],
+            "Author Profile": profiles.get(stats["id"], {}).get("url", ""),
+            "Citations": stats["citations"],
+            "Influential Citations": stats["influential"],
+        }
+        for intent in INTENTS:
+            row[f"{intent.title()} Intents"] = stats["intents"].get(intent, 0)
+        row["Contexts"] = len(ids)
+        row["Mean Sentiment"] = table.mean_score(ids)
+        row["Keywords"] = "; ".join(table.keywords(ids, AUTHOR_KEYWORDS))
+        row["Example Context"] = table.sentences[ids[0]] if ids else ""
+        yield row
+
+
+def main():
+    try:
+        table, edges, authors = collect(iter_citations())
+    except FileNotFoundError:
+        print("Error: no citation data found. Please run `whocite fetch-citations` first.")
+        return
+    try:
+        profiles = load_authors(["url"])
+    except FileNotFoundError:
+        profiles = {}
+
+    edges_path = config.OUTPUT_DIR / EDGES_FILE
+    authors_path = config.OUTPUT_DIR / AUTHORS_FILE
+    edge_count = write_rows(iter_edge_rows(table, edges), edges_path)
+    author_count = write_rows(iter_author_rows(table, authors, profiles), authors_path)
+
+    print(f"Processed {edge_count} citations with {len(table.sentences)} distinct context sentences.")
+    intents = Counter(intent for edge in edges for intent in edge["intents"])
+    if edges:
+        influential = sum(edge["influential"] for edge in edges)
+        print(f"  Influential: {influential} ({influential / len(edges):.0%})")
+        for intent in INTENTS:
+            print(f"  {intent.title()}: {intents[intent]} ({intents[intent] / len(edges):.0%})")
+    print(f"Saved {EDGES_FILE} and {AUTHORS_FILE} ({author_count} authors)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import csv
+import gzip
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+
+from .config import config
+
+CHUNK_SIZE = 10_000
+
+# Final reports that `whocite export` converts, in pipeline order
+REPORTS = [
+    "citations_analysis.csv",
+    "high_impact_citing_authors.csv",
+    "high_impact_authors_enriched.csv",
+]
+
+FORMATS = {"csv": ".csv", "csv.gz": ".csv.gz", "parquet": ".parquet"}
+
+
+def chunked(rows, size=CHUNK_SIZE):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def encode_csv(rows, fieldnames):
+    """CSV text for rows, without a header."""
+    buffer = io.StringIO()
+    csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore").writerows(rows)
+    return buffer.getvalue()
+
+
+def encode_json_items(rows, indent=2):
+    """Array elements as json.dump(..., indent) lays them out, without the brackets."""
+    pad = "\n" + " " * indent if indent else ""
+    items = [json.dumps(row, indent=indent) for row in rows]
+    if indent:
+        items = [item.replace("\n", pad) for item in items]
+    return pad + ("," + pad).join(items) if items else ""
+
+
+# Sinks accept rows through write(), or text produced by the encode_* helpers
+# (e.g. in worker processes) through write_encoded().
+
+class CsvSink:
+    """CSV writer; a .gz suffix selects gzip compression."""
+
+    def __init__(self, path, fieldnames):
+        opener = gzip.open if str(path).endswith(".gz") else open
+        self._file = opener(path, "wt", newline="", encoding="utf-8")
+        self._fieldnames = fieldnames
+        csv.DictWriter(self._file, fieldnames=fieldnames).writeheader()
+
+    def write(self, chunk):
+        self.write_encoded(encode_csv(chunk, self._fieldnames))
+
+    def write_encoded(self, text):
+        self._file.write(text)
+
+    def close(self):
+        self._file.close()
+
+
+class JsonArraySink:
+    """Writes a JSON array one element at a time instead of dumping a whole list."""
+
+    def __init__(self, path, fieldnames=None, indent=2):
+        self._file = open(path, "w", encoding="utf-8")
+        self._indent = indent
+        self._first = True
+        self._file.write("[")
+
+    def write(self, chunk):
+        self.write_encoded(encode_json_items(chunk, self._indent))
+
+    def write_encoded(self, text):
+        if not text:
+            return
+        if not self._first:
+            self._file.write(",")
+        self._file.write(text)
+        self._first = False
+
+    def close(self):
+        self._file.write("\n]" if not self._first and self._indent else "]")
+        self._file.close()
+
+
+class ParquetSink:
+    """Parquet writer, one row group per chunk. All columns are stored as strings."""
+
+    def __init__(self, path, fieldnames):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet export needs pyarrow (uv pip install pyarrow)") from e
+        self._pa = pa
+        self._fieldnames = fieldnames
+        self._schema = pa.schema([(name, pa.string()) for name in fieldnames])
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    def write(self, chunk):
+        columns = {
+            name: [None if row.get(name) in (None, "") else str(row.get(name)) for row in chunk]
+            for name in self._fieldnames
+        }
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def open_sink(path, fieldnames):
+    name = str(path)
+    if name.endswith(".parquet"):
+        return ParquetSink(path, fieldnames)
+    if name.endswith(".json"):
+        return JsonArraySink(path, fieldnames)
+    return CsvSink(path, fieldnames)
+
+
+def write_rows(rows, paths, fieldnames=None, chunk_size=CHUNK_SIZE):
+    """
+    Streams dict rows into one or more files in a single pass.
+
+    The format of each target follows its suffix (.csv, .csv.gz, .parquet,
+    .json). Rows are consumed `chunk_size` at a time, so a generator source
+    keeps memory flat however large the export is. Without `fieldnames` the
+    keys of the first row are used, and an empty source writes nothing;
+    with them, an empty source still produces header-only files. Returns the
+    number of rows written.
+    """
+    if not isinstance(paths, (list, tuple)):
+        paths = [paths]
+    chunks = chunked(rows, chunk_size)
+    first = next(chunks, None)
+    if first is None and not fieldnames:
+        return 0
+    fieldnames = list(fieldnames or first[0].keys())
+
+    sinks = [open_sink(path, fieldnames) for path in paths]
+    count = 0
+    try:
+        for chunk in chain([first] if first else [], chunks):
+            for sink in sinks:
+                sink.write(chunk)
+            count += len(chunk)
+    finally:
+        for sink in sinks:
+            sink.close()
+    return count
+
+
+def read_rows(path):
+    """Yields rows of a CSV (optionally gzipped) report without loading it whole."""
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def export_report(source, target, chunk_size=CHUNK_SIZE):
+    """Converts one report; runs inside a worker process."""
+    with open(source, "r", newline="", encoding="utf-8") as f:
+        fieldnames = next(csv.reader(f), None)
+    if not fieldnames:
+        return target, 0
+    return target, write_rows(read_rows(source), target, fieldnames, chunk_size)
+
+
+def export_reports(fmt="csv.gz", reports=None, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Exports the final reports from the output directory in parallel.
+    Each report is streamed by its own worker process into output/exports/.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'; choose from {', '.join(FORMATS)}")
+    export_dir = config.OUTPUT_DIR / "exports"
+    export_dir.mkdir(exist_ok=True)
+
+    jobs = []
+    for name in reports or REPORTS:
+        source = config.OUTPUT_DIR / name
+        if not source.exists():
+            print(f"  Skipping {name}: not found.")
+            continue
+        target = export_dir / (source.name.removesuffix(".csv") + FORMATS[fmt])
+        jobs.append((source, target))
+
+    if not jobs:
+        print("No reports to export.")
+        return []
+
+    with ProcessPoolExecutor(max_workers=workers or len(jobs)) as pool:
+        futures = [pool.submit(export_report, source, target, chunk_size) for source, target in jobs]
+        results = [future.result() for future in futures]
+    for target, count in results:
+        print(f"  Exported {count} rows to {target}")
+    return results
@@ -0,0 +1,274 @@
+import hashlib
+import json
+import re
+import time
+
+import requests
+
+from .config import config
+from .session import session
+
+S2_API = "https://api.semanticscholar.org/graph/v1"
+PAPER_BATCH_SIZE = 500  # documented maximum for /paper/batch
+BIB_CACHE_FILE = "bib_cache.json"
+PAPER_ID_MAP_FILE = "paper_id_map.json"
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_bib_entries(bib_path):
+    """
+    Parses a BibTeX file, reusing the previous parse while the file is unchanged.
+    The cache is keyed by the SHA-256 of the file, so any edit triggers a full parse.
+    """
+    cache_path = config.OUTPUT_DIR / BIB_CACHE_FILE
+    sha = file_sha256(bib_path)
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("sha256") == sha:
+            return cached["entries"]
+    except (FileNotFoundError, ValueError):
+        pass
+
+    import bibtexparser
+
+    with open(bib_path, "r", encoding="utf-8") as bibtex_file:
+        entries = bibtexparser.load(bibtex_file).entries
+
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump({"sha256": sha, "entries": entries}, f)
+    return entries
+
+
+def normalize_title(title):
+    """Lower-cased alphanumerics only, so BibTeX braces and spacing do not matter."""
+    return re.sub(r"[^a-z0-9]+", "", (title or "").lower())
+
+
+def paper_key(paper):
+    """Stable identity of one of our papers across runs: DOI, Semantic Scholar ID or title."""
+    if paper.get("doi"):
+        return "DOI:" + paper["doi"].lower()
+    if paper.get("s2_paper_id"):
+        return paper["s2_paper_id"]
+    return "TITLE:" + normalize_title(paper.get("title"))
+
+
+def external_id(entry):
+    """
+    Finds an identifier Semantic Scholar's /paper/batch understands, or a DOI
+    hidden in the URL field. Returns ("DOI", doi), ("S2", id) or (None, None).
+    """
+    url = entry.get("url", "")
+    doi_match = re.search(r"doi\.org/(10\.\S+)", url)
+    if doi_match:
+        return "DOI", doi_match.group(1)
+
+    eprint = entry.get("eprint", "")
+    if eprint and entry.get("archiveprefix", "arXiv").lower() == "arxiv":
+        return "S2", f"ARXIV:{eprint}"
+    arxiv_match = re.search(r"arxiv\.org/(?:abs|pdf)/([^\s/]+?)(?:v\d+)?(?:\.pdf)?$", url)
+    if arxiv_match:
+        return "S2", f"ARXIV:{arxiv_match.group(1)}"
+    if entry.get("pmid"):
+        return "S2", f"PMID:{entry['pmid']}"
+    return None, None
+
+
+def load_paper_id_map():
+    try:
+        with open(config.OUTPUT_DIR / PAPER_ID_MAP_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_paper_id_map(id_map):
+    with open(config.OUTPUT_DIR / PAPER_ID_MAP_FILE, "w", encoding="utf-8") as f:
+        json.dump(id_map, f, indent=2)
+
+
+def fetch_papers_batch(ids, fields, api_key=None):
+    """
+    Looks up papers by any supported ID (DOI:, ARXIV:, PMID:, CorpusId:, ...)
+    through /paper/batch. Returns a list aligned with `ids`, None where unknown.
+    """
+    headers = {}
+    if api_key:
+        headers["x-api-key"] = api_key
+
+    results = []
+    for i in range(0, len(ids), PAPER_BATCH_SIZE):
+        chunk = ids[i:i + PAPER_BATCH_SIZE]
+        r = session.post(
+            f"{S2_API}/paper/batch",
+            params={"fields": fields},
+            json={"ids": chunk},
+            headers=headers,
+            timeout=60,
+        )
+        r.raise_for_status()
+        results.extend(r.json())
+        if i + PAPER_BATCH_SIZE < len(ids):
+            time.sleep(1.1)
+    return results
+
+
+def match_title(title, api_key=None):
+    """Best title match from /paper/search/match, or None."""
+    headers = {}
+    if api_key:
+        headers["x-api-key"] = api_key
+    r = session.get(
+        f"{S2_API}/paper/search/match",
+        params={"query": title, "fields": "paperId,externalIds,title"},
+        headers=headers,
+        timeout=30,
+    )
+    if r.status_code == 404:
+        return None
+    r.raise_for_status()
+    data = r.json().get("data", [])
+    return data[0] if data else None
+
+
+def _apply_resolution(entry, resolved):
+    if not resolved:
+        return
+    entry["s2_paper_id"] = resolved["paperId"]
+    if resolved.get("doi"):
+        entry["doi"] = resolved["doi"]
+
+
+def resolve_missing_dois(entries, api_key=None):
+    """
+    Resolves entries without a DOI to Semantic Scholar paper IDs.
+
+    Entries carrying an arXiv/PubMed ID are looked up together through
+    /paper/batch; the rest fall back to title matching. Results, including
+    misses, are persisted in paper_id_map.json keyed by normalized title, so
+    re-runs only look up entries that have never been seen.
+    """
+    id_map = load_paper_id_map()
+    by_external_id = {}
+    by_title = []
+
+    for entry in entries:
+        if entry.get("doi"):
+            continue
+        key = normalize_title(entry.get("title"))
+        if not key:
+            continue
+        if key in id_map:
+            _apply_resolution(entry, id_map[key])
+            continue
+
+        kind, value = external_id(entry)
+        if kind == "DOI":
+            entry["doi"] = value
+        elif kind == "S2":
+            by_external_id.setdefault(value, []).append((key, entry))
+        else:
+            by_title.append((key, entry))
+
+    if not by_external_id and not by_title:
+        return entries
+
+    if by_external_id:
+        ids = list(by_external_id)
+        print(f"Resolving {len(ids)} DOI-less entries by external ID in bulk...")
+        try:
+            papers = fetch_papers_batch(ids, "paperId,externalIds,title", api_key)
+        except requests.exceptions.RequestException as e:
+            print(f"  Error in batch lookup: {e}")
+            papers = None
+        if papers is not None:
+            for paper_ref, paper in zip(ids, papers):
+                for key, entry in by_external_id[paper_ref]:
+                    if paper:
+                        id_map[key] = {
+                            "paperId": paper["paperId"],
+                            "doi": (paper.get("externalIds") or {}).get("DOI"),
+                        }
+                        _apply_resolution(entry, id_map[key])
+                    else:
+                        # Not in the index under that ID; try the title instead
+                        by_title.append((key, entry))
+
+    if by_title:
+        # Semantic Scholar has no bulk title endpoint; each match is a single
+        # request, but it is only ever made once per title thanks to the map
+        print(f"Resolving {len(by_title)} DOI-less entries by title...")
+        for key, entry in by_title:
+            try:
+                paper = match_title(entry.get("title"), api_key)
+            except requests.exceptions.RequestException as e:
+                print(f"  Error matching title '{entry.get('title')}': {e}")
+                continue
+            id_map[key] = {
+                "paperId": paper["paperId"],
+                "doi": (paper.get("externalIds") or {}).get("DOI"),
+            } if paper else None
+            _apply_resolution(entry, id_map[key])
+            time.sleep(1.1)
+
+    save_paper_id_map(id_map)
+    looked_up = {key for pairs in by_external_id.values() for key, _ in pairs}
+    looked_up.update(key for key, _ in by_title)
+    resolved = sum(1 for key in looked_up if id_map.get(key))
+    print(f"  Resolved {resolved}/{len(looked_up)} entries; mapping saved to {PAPER_ID_MAP_FILE}")
+    return entries
+
+
+def plan_citation_fetches(entries, api_key=None, page_size=1000):
+    """
+    Preflight for step 1: looks up every paper in one or a few /paper/batch
+    requests to learn which exist and how often they are cited.
+
+    Returns (plan, dropped). `plan` lists {"paper", "citation_count", "pages"}
+    sorted most-cited first; papers unknown to Semantic Scholar or without
+    citations go to `dropped` as (entry, reason) and cost no further requests.
+    If the preflight itself fails, every paper is planned in bib order with
+    an unknown citation count.
+    """
+    candidates = []
+    dropped = []
+    for entry in entries:
+        if entry.get("doi"):
+            candidates.append(("DOI:" + entry["doi"], entry))
+        elif entry.get("s2_paper_id"):
+            candidates.append((entry["s2_paper_id"], entry))
+        else:
+            dropped.append((entry, "no DOI and no Semantic Scholar match"))
+
+    if not candidates:
+        return [], dropped
+
+    print(f"Preflight: looking up {len(candidates)} papers via /paper/batch...")
+    try:
+        papers = fetch_papers_batch([ref for ref, _ in candidates], "paperId,citationCount", api_key)
+    except requests.exceptions.RequestException as e:
+        print(f"  Preflight failed ({e}); fetching all papers without a plan.")
+        return [{"paper": entry, "citation_count": None, "pages": None} for _, entry in candidates], dropped
+
+    plan = []
+    for (_, entry), paper in zip(candidates, papers):
+        if not paper:
+            dropped.append((entry, "not found in Semantic Scholar"))
+            continue
+        count = paper.get("citationCount") or 0
+        if count == 0:
+            dropped.append((entry, "no citations"))
+            continue
+        entry.setdefault("s2_paper_id", paper["paperId"])
+        plan.append({"paper": entry, "citation_count": count, "pages": -(-count // page_size)})
+
+    plan.sort(key=lambda item: item["citation_count"], reverse=True)
+    return plan, dropped
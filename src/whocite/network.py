@@ -0,0 +1,203 @@
+from collections import Counter
+
+from .artifacts import iter_citations
+from .config import config
+from .export import write_rows
+
+NETWORK_FILE = "author_network.csv"
+# Consortium papers with more authors than this add no co-authorship edges;
+# they would otherwise add a dense clique of a few thousand authors
+MAX_COAUTHORS = 50
+DAMPING = 0.85
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-9
+
+# Metric -> column added to the analysis rows
+NETWORK_COLUMNS = {
+    "papers_cited": "Citing Author Papers Cited",
+    "coauthors": "Citing Author Co-authors",
+    "cluster": "Citing Author Cluster",
+    "cluster_size": "Citing Author Cluster Size",
+    "centrality": "Citing Author Centrality",
+}
+
+
+def build_incidence(citations_data):
+    """
+    Turns the citation data into sparse incidence lists, indexing authors by
+    first appearance. Returns (author_ids, names, cited, papers): `cited[i]`
+    is the set of our papers author i cites, and `papers` lists the authors
+    of each distinct citing paper (a paper citing several of ours counts once).
+    """
+    index, names, cited = {}, [], []
+    papers = {}
+    for paper_no, entry in enumerate(citations_data):
+        for citation in entry.get("citations", []):
+            citing = citation.get("citingPaper") or {}
+            members = {}
+            for author in citing.get("authors", []):
+                a_id = author.get("authorId")
+                if not a_id:
+                    continue
+                i = index.get(a_id)
+                if i is None:
+                    i = index[a_id] = len(names)
+                    names.append(author.get("name") or "")
+                    cited.append(set())
+                cited[i].add(paper_no)
+                members[i] = None
+            key = citing.get("paperId") or citing.get("title")
+            if key and members:
+                papers[key] = list(members)
+    return list(index), names, cited, list(papers.values())
+
+
+def _analyze_scipy(n, papers):
+    """Co-author graph as A = B Bᵀ of the sparse author x paper incidence matrix B."""
+    import numpy as np
+    from scipy.sparse import csr_matrix, diags
+    from scipy.sparse.csgraph import connected_components
+
+    rows = [i for members in papers for i in members]
+    cols = [j for j, members in enumerate(papers) for _ in members]
+    incidence = csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, len(papers)))
+    # Off-diagonal entries count the papers two authors wrote together
+    adjacency = (incidence @ incidence.T).tocsr()
+    adjacency = (adjacency - diags(adjacency.diagonal())).tocsr()
+    adjacency.eliminate_zeros()
+
+    degree = np.diff(adjacency.indptr)
+    _, labels = connected_components(adjacency, directed=False)
+
+    strength = np.asarray(adjacency.sum(axis=1)).ravel()
+    inverse = np.divide(1.0, strength, out=np.zeros(n), where=strength > 0)
+    transition = (diags(inverse) @ adjacency).T.tocsr()
+    dangling = strength == 0
+    rank = np.full(n, 1.0 / n)
+    for _ in range(MAX_ITERATIONS):
+        new = DAMPING * (transition @ rank) + (DAMPING * rank[dangling].sum() + 1 - DAMPING) / n
+        done = np.abs(new - rank).sum() < TOLERANCE
+        rank = new
+        if done:
+            break
+    return degree.tolist(), labels.tolist(), rank.tolist()
+
+
+def _analyze_python(n, papers):
+    """Same as _analyze_scipy on adjacency dicts, for installs without scipy."""
+    adjacency = [Counter() for _ in range(n)]
+    for members in papers:
+        for i in members:
+            for j in members:
+                if i != j:
+                    adjacency[i][j] += 1
+
+    degree = [len(neighbours) for neighbours in adjacency]
+
+    labels = [-1] * n
+    for start in range(n):
+        if labels[start] != -1:
+            continue
+        labels[start] = start
+        stack = [start]
+        while stack:
+            for j in adjacency[stack.pop()]:
+                if labels[j] == -1:
+                    labels[j] = start
+                    stack.append(j)
+
+    strength = [sum(neighbours.values()) for neighbours in adjacency]
+    rank = [1.0 / n] * n
+    for _ in range(MAX_ITERATIONS):
+        leaked = sum(r for r, s in zip(rank, strength) if not s)
+        new = [(DAMPING * leaked + 1 - DAMPING) / n] * n
+        for i, neighbours in enumerate(adjacency):
+            if strength[i]:
+                share = DAMPING * rank[i] / strength[i]
+                for j, weight in neighbours.items():
+                    new[j] += share * weight
+        done = sum(abs(a - b) for a, b in zip(new, rank)) < TOLERANCE
+        rank = new
+        if done:
+            break
+    return degree, labels, rank
+
+
+def author_network(citations_data):
+    """
+    Co-citation and collaboration metrics per citing author ID:
+
+    - papers_cited: how many of our papers the author cites
+    - coauthors: distinct co-authors among the citing papers
+    - cluster / cluster_size: connected co-authorship group, numbered from
+      the largest (1) down
+    - centrality: PageRank on the co-authorship graph weighted by joint
+      papers, scaled so the average author scores 1.0
+
+    Uses scipy sparse matrices when scipy is installed, plain dicts otherwise.
+    """
+    author_ids, names, cited, papers = build_incidence(citations_data)
+    n = len(author_ids)
+    if not n:
+        return {}
+    papers = [members for members in papers if 2 <= len(members) <= MAX_COAUTHORS]
+    try:
+        degree, labels, rank = _analyze_scipy(n, papers)
+    except ImportError:
+        degree, labels, rank = _analyze_python(n, papers)
+
+    sizes = Counter(labels)
+    # Label order is the first author seen in each group, so numbering is stable
+    first_seen = {}
+    for label in labels:
+        first_seen.setdefault(label, len(first_seen))
+    ordered = sorted(sizes, key=lambda label: (-sizes[label], first_seen[label]))
+    cluster_no = {label: no for no, label in enumerate(ordered, 1)}
+
+    return {
+        a_id: {
+            "name": names[i],
+            "papers_cited": len(cited[i]),
+            "coauthors": degree[i],
+            "cluster": cluster_no[labels[i]],
+            "cluster_size": sizes[labels[i]],
+            "centrality": round(rank[i] * n, 3),
+        }
+        for i, a_id in enumerate(author_ids)
+    }
+
+
+def main():
+    try:
+        network = author_network(iter_citations())
+    except FileNotFoundError:
+        print("Error: no citation data found. Please run `whocite fetch-citations` first.")
+        return
+    if not network:
+        print("No citing authors found.")
+        return
+
+    rows = sorted(
+        (
+            {
+                "Author ID": a_id,
+                "Author Name": metrics["name"],
+                "Papers Cited": metrics["papers_cited"],
+                "Co-authors": metrics["coauthors"],
+                "Cluster": metrics["cluster"],
+                "Cluster Size": metrics["cluster_size"],
+                "Centrality": metrics["centrality"],
+            }
+            for a_id, metrics in network.items()
+        ),
+        key=lambda row: (-row["Centrality"], -row["Papers Cited"]),
+    )
+    output_path = config.OUTPUT_DIR / NETWORK_FILE
+    write_rows(rows, output_path)
+    clusters = len({row["Cluster"] for row in rows})
+    print(f"Analyzed {len(rows)} citing authors in {clusters} co-authorship clusters.")
+    print(f"Saved to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+SCAN_CHUNK = 1 << 20  # bytes csv_byte_ranges reads at a time
+
+
+def resolve_workers(workers):
+    """0 means one worker per CPU core; None or 1 means run in-process."""
+    if workers == 0:
+        return os.cpu_count() or 1
+    return workers or 1
+
+
+def process_pool(workers):
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def split_weighted(items, weights, shards):
+    """
+    Splits items into at most `shards` contiguous groups of roughly equal
+    total weight. Contiguity keeps the merged output in the original order.
+    """
+    total = sum(weights) or 1
+    target = total / shards
+    groups, current, acc = [], [], 0
+    for item, weight in zip(items, weights):
+        current.append(item)
+        acc += weight
+        if acc >= target * (len(groups) + 1) and len(groups) < shards - 1:
+            groups.append(current)
+            current = []
+    if current:
+        groups.append(current)
+    return groups
+
+
+def csv_byte_ranges(path, shards):
+    """
+    Splits a CSV file into byte ranges that each start at a record boundary.
+
+    Candidate split points are advanced to the next newline that is outside a
+    quoted field (an even number of quote characters precede it), so rows
+    whose fields contain line breaks are never cut in half. Whether an offset
+    is inside a quoted field depends on every quote before it, so the file is
+    scanned once, but in fixed-size chunks that only count quotes; memory
+    stays flat however large the file is. Returns (header, ranges) where
+    ranges cover everything after the header line.
+    """
+    with open(path, "rb") as f:
+        header_line = f.readline()
+        if not header_line.endswith(b"\n"):
+            return [], []
+        header = next(csv.reader([header_line.decode("utf-8")]))
+        header_end = f.tell()
+        size = os.fstat(f.fileno()).st_size
+
+        step = max(1, (size - header_end) // shards)
+        bounds = [header_end]
+        target = header_end + step
+        quotes = 0  # quote characters between header_end and the scan position
+        base = header_end  # file offset of the current chunk
+        while len(bounds) < shards:
+            chunk = f.read(SCAN_CHUNK)
+            if not chunk:
+                break
+            offset = 0
+            while len(bounds) < shards:
+                # First line end past the target, then line by line until the quotes balance
+                nl = chunk.find(b"\n", max(offset, target - 1 - base))
+                if nl == -1:
+                    quotes += chunk.count(b'"', offset)
+                    break
+                quotes += chunk.count(b'"', offset, nl + 1)
+                offset = nl + 1
+                if quotes % 2 == 0:
+                    if base + offset >= size:
+                        break
+                    bounds.append(base + offset)
+                    target = base + offset + step
+            base += len(chunk)
+    bounds.append(size)
+    return header, list(zip(bounds, bounds[1:]))
+
+
+def read_csv_range(path, header, start, end):
+    """Parses the rows stored in one byte range produced by csv_byte_ranges."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+    return csv.DictReader(io.StringIO(text, newline=""), fieldnames=header)
@@ -0,0 +1,225 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+from urllib.parse import parse_qs, urlparse
+
+from .config import config
+from .export import read_rows
+
+SOURCE_FILE = "citations_analysis.csv"
+INDEX_FILE = "citations_index.sqlite"
+
+# CSV column -> indexed column
+COLUMNS = {
+    "My Paper DOI": "my_doi",
+    "My Paper Title": "my_title",
+    "Citing Paper Title": "citing_title",
+    "Citing Paper Year": "year",
+    "Citing Paper Venue": "venue",
+    "Citing Author Name": "author",
+    "Citing Author Affiliation": "affiliation",
+    "Citing Author h-index": "h_index",
+    "Citing Author Total Citations": "author_citations",
+    "Citing Author Profile": "profile",
+}
+INTEGER_COLUMNS = {"year", "h_index", "author_citations"}
+_build_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE citations (
+    id INTEGER PRIMARY KEY,
+    my_doi TEXT, my_title TEXT, citing_title TEXT, year INTEGER, venue TEXT,
+    author TEXT, affiliation TEXT, h_index INTEGER, author_citations INTEGER, profile TEXT
+);
+CREATE INDEX idx_my_doi ON citations (my_doi COLLATE NOCASE);
+CREATE INDEX idx_year ON citations (year);
+CREATE INDEX idx_profile ON citations (profile);
+-- Token index for free-text filters on names, institutions, titles and venues
+CREATE VIRTUAL TABLE citations_fts USING fts5(
+    author, affiliation, my_title, venue, content='citations', content_rowid='id'
+);
+"""
+
+
+def index_path():
+    return config.OUTPUT_DIR / INDEX_FILE
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_index(force=False):
+    """
+    (Re)builds the SQLite index from citations_analysis.csv when the CSV is
+    newer than the index. The new index is written next to the old one and
+    swapped in atomically, so a running API server never sees a partial file.
+    """
+    source = config.OUTPUT_DIR / SOURCE_FILE
+    target = index_path()
+    if not source.exists():
+        raise FileNotFoundError(f"{source} not found. Please run `whocite analyze` first.")
+    if not force and target.exists() and target.stat().st_mtime >= source.stat().st_mtime:
+        return target
+
+    with _build_lock:
+        if not force and target.exists() and target.stat().st_mtime >= source.stat().st_mtime:
+            return target
+        _write_index(source, target)
+    return target
+
+
+def _write_index(source, target):
+    tmp = target.with_suffix(".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript(SCHEMA)
+        names = list(COLUMNS.values())
+        insert = f"INSERT INTO citations ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+        rows = read_rows(source)
+        while chunk := list(islice(rows, 10_000)):
+            conn.executemany(insert, [
+                [_to_int(row.get(col)) if name in INTEGER_COLUMNS else row.get(col, "")
+                 for col, name in COLUMNS.items()]
+                for row in chunk
+            ])
+        conn.execute("INSERT INTO citations_fts (citations_fts) VALUES ('rebuild')")
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, target)
+
+
+def connect():
+    build_index()
+    # Read-only: the query layer never changes the processed data
+    return sqlite3.connect(f"file:{index_path()}?mode=ro", uri=True)
+
+
+def _phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def query(conn, author=None, institution=None, paper=None, year=None, venue=None,
+          page=1, per_page=50, distinct_authors=False):
+    """
+    Filters citation-author rows. `author`, `institution` and `venue` match
+    whole words (case-insensitive) through the FTS index; `paper` is either a
+    DOI (exact) or words of one of our titles; `year` is a year or "from-to".
+    Returns {"total", "page", "per_page", "results"}. With `distinct_authors`
+    each result is one author with the number of matching citations.
+    """
+    where, params, match = [], [], []
+    if author:
+        match.append(f"author : {_phrase(author)}")
+    if institution:
+        match.append(f"affiliation : {_phrase(institution)}")
+    if venue:
+        match.append(f"venue : {_phrase(venue)}")
+    if paper:
+        if paper.startswith("10."):
+            where.append("c.my_doi = ? COLLATE NOCASE")
+            params.append(paper)
+        else:
+            match.append(f"my_title : {_phrase(paper)}")
+    if year:
+        start, _, end = str(year).partition("-")
+        where.append("c.year BETWEEN ? AND ?")
+        params.extend([int(start), int(end or start)])
+
+    source = "citations c"
+    if match:
+        where.insert(0, "c.id IN (SELECT rowid FROM citations_fts WHERE citations_fts MATCH ?)")
+        params.insert(0, " AND ".join(match))
+    condition = f" WHERE {' AND '.join(where)}" if where else ""
+
+    per_page = max(1, min(int(per_page), 1000))
+    page = max(1, int(page))
+    offset = (page - 1) * per_page
+
+    if distinct_authors:
+        group = "COALESCE(NULLIF(c.profile, ''), c.author)"
+        total = conn.execute(f"SELECT COUNT(DISTINCT {group}) FROM {source}{condition}", params).fetchone()[0]
+        cursor = conn.execute(
+            f"SELECT c.author, c.affiliation, c.h_index, c.author_citations, c.profile, COUNT(*) AS citations "
+            f"FROM {source}{condition} GROUP BY {group} ORDER BY citations DESC, c.author_citations DESC "
+            f"LIMIT ? OFFSET ?",
+            params + [per_page, offset],
+        )
+    else:
+        total = conn.execute(f"SELECT COUNT(*) FROM {source}{condition}", params).fetchone()[0]
+        cursor = conn.execute(
+            f"SELECT c.* FROM {source}{condition} ORDER BY c.id LIMIT ? OFFSET ?",
+            params + [per_page, offset],
+        )
+
+    names = [d[0] for d in cursor.description]
+    labels = {v: k for k, v in COLUMNS.items()}
+    results = [
+        {labels.get(name, name): value for name, value in zip(names, row) if name != "id"}
+        for row in cursor
+    ]
+    return {"total": total, "page": page, "per_page": per_page, "results": results}
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """GET /citations?author=&institution=&paper=&year=&venue=&page=&per_page=&distinct_authors=1"""
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            return self._send(200, {"status": "ok"})
+        if url.path != "/citations":
+            return self._send(404, {"error": "not found"})
+
+        args = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        filters = {k: args.get(k) for k in ("author", "institution", "paper", "year", "venue")}
+        try:
+            # A connection per request is cheap, and picks up an index rebuilt
+            # after the pipeline refreshed citations_analysis.csv
+            with closing(connect()) as conn:
+                result = query(
+                    conn,
+                    page=args.get("page", 1),
+                    per_page=args.get("per_page", 50),
+                    distinct_authors=args.get("distinct_authors") in ("1", "true"),
+                    **filters,
+                )
+        except (ValueError, sqlite3.OperationalError) as e:
+            return self._send(400, {"error": str(e)})
+        except FileNotFoundError as e:
+            # No analysis yet, or the pipeline is between runs
+            return self._send(503, {"error": str(e)})
+        self._send(200, result)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host="127.0.0.1", port=8765):
+    build_index()
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    print(f"Serving citation queries on http://{host}:{port}/citations (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        server.server_close()
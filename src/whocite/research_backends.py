@@ -0,0 +1,424 @@
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+from .config import config
+from .token_budget import BudgetExceeded, TokenBudget, estimate_tokens
+
+# Provider SDKs are imported inside the backends that use them so that picking
+# one backend never pays for (or requires) the others.
+
+
+@dataclass
+class BackendResponse:
+    text: str
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+
+
+# (index into the submitted prompts, response or None, exception or None)
+ResearchOutcome = Tuple[int, Optional[BackendResponse], Optional[Exception]]
+
+
+class ResearchBackend:
+    """Sends research prompts to one LLM provider.
+
+    Subclasses implement `research` for a single prompt and declare how many
+    requests the provider tolerates in flight. Backends whose provider offers
+    a bulk API set `supports_batch` and implement `_submit_batch`.
+
+    `schema` is a JSON schema for the answer. Backends pass it to the
+    provider's structured-output feature where one exists; otherwise the
+    prompt itself has to ask for JSON.
+    """
+
+    name = "base"
+    max_concurrency = 1
+    supports_batch = False
+
+    def __init__(self, settings=None):
+        self.settings = settings
+        if settings is not None and settings.max_concurrency:
+            self.max_concurrency = settings.max_concurrency
+
+    @property
+    def model(self) -> str:
+        return self.settings.model if self.settings else ""
+
+    def research(self, prompt: str, schema: Optional[dict] = None) -> BackendResponse:
+        raise NotImplementedError
+
+    def research_many(
+        self,
+        prompts: List[str],
+        budget: Optional[TokenBudget] = None,
+        schema: Optional[dict] = None,
+    ) -> Iterator[ResearchOutcome]:
+        """
+        Runs prompts concurrently and yields outcomes as they complete.
+
+        Prompts are submitted in order with at most `max_concurrency` in
+        flight, so a budget is charged against the earliest prompts first.
+        Once the next prompt does not fit the budget, it and all later prompts
+        are yielded with a BudgetExceeded error instead of being sent.
+        """
+        pending = {}
+        next_index = 0
+        exhausted = False
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            while next_index < len(prompts) or pending:
+                while not exhausted and next_index < len(prompts) and len(pending) < self.max_concurrency:
+                    estimate = estimate_tokens(prompts[next_index])
+                    if budget is not None and not budget.try_reserve(estimate):
+                        exhausted = True
+                        break
+                    future = pool.submit(self.research, prompts[next_index], schema)
+                    pending[future] = (next_index, estimate)
+                    next_index += 1
+
+                if exhausted and not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i, estimate = pending.pop(future)
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        if budget is not None:
+                            budget.release(estimate)
+                        yield i, None, e
+                        continue
+                    if budget is not None:
+                        budget.record(estimate, response.input_tokens, response.output_tokens)
+                    yield i, response, None
+
+        for i in range(next_index, len(prompts)):
+            yield i, None, BudgetExceeded("research budget exhausted")
+
+    def research_batch(
+        self,
+        prompts: List[str],
+        budget: Optional[TokenBudget] = None,
+        schema: Optional[dict] = None,
+    ) -> Iterator[ResearchOutcome]:
+        """
+        Submits prompts through the provider's batch API.
+
+        With a budget, only the leading prompts whose estimates fit are
+        submitted; the rest are yielded with a BudgetExceeded error.
+        """
+        estimates = []
+        for prompt in prompts:
+            estimate = estimate_tokens(prompt)
+            if budget is not None and not budget.try_reserve(estimate):
+                break
+            estimates.append(estimate)
+
+        submitted = self._submit_batch(prompts[:len(estimates)], schema) if estimates else []
+        for i, response, error in submitted:
+            if budget is not None:
+                if response is not None:
+                    budget.record(estimates[i], response.input_tokens, response.output_tokens)
+                else:
+                    budget.release(estimates[i])
+            yield i, response, error
+
+        for i in range(len(estimates), len(prompts)):
+            yield i, None, BudgetExceeded("research budget exhausted")
+
+    def _submit_batch(self, prompts: List[str], schema: Optional[dict] = None) -> Iterator[ResearchOutcome]:
+        raise NotImplementedError(f"{self.name} backend has no batch API")
+
+
+class GeminiBackend(ResearchBackend):
+    """Google GenAI with Google Search grounding."""
+
+    name = "gemini"
+    max_concurrency = 4
+    supports_batch = True
+    default_model = "gemini-2.0-flash-exp"
+    poll_interval = 30
+
+    def __init__(self, settings=None):
+        super().__init__(settings)
+        from google import genai
+
+        api_key = os.environ.get("GOOGLE_API_KEY")
+        if settings and settings.api_key:
+            api_key = settings.api_key
+        if not api_key:
+            print("Warning: GOOGLE_API_KEY not found in env or config/config.toml. Client init might fail.")
+        self.client = genai.Client(api_key=api_key)
+
+    @property
+    def model(self) -> str:
+        if self.settings and self.settings.model:
+            return self.settings.model
+        return self.default_model
+
+    @property
+    def native_schema(self) -> bool:
+        # Gemini 2.x rejects a response schema combined with the search tool
+        return self.model.startswith("gemini-3")
+
+    def _generate_config(self, schema=None):
+        from google.genai import types
+
+        extra = {}
+        if schema and self.native_schema:
+            extra = {"response_mime_type": "application/json", "response_json_schema": schema}
+        return types.GenerateContentConfig(
+            tools=[types.Tool(google_search=types.GoogleSearch())],
+            temperature=self.settings.temperature if self.settings else 1.0,
+            **extra,
+        )
+
+    @staticmethod
+    def _to_response(response) -> BackendResponse:
+        text = ""
+        if response.candidates and response.candidates[0].content and response.candidates[0].content.parts:
+            text = "".join(p.text for p in response.candidates[0].content.parts if p.text)
+        usage = getattr(response, "usage_metadata", None)
+        input_tokens = getattr(usage, "prompt_token_count", None)
+        output_tokens = getattr(usage, "candidates_token_count", None)
+        # Search grounding prompts and thinking are billed too, as input and output
+        if input_tokens is not None:
+            input_tokens += getattr(usage, "tool_use_prompt_token_count", None) or 0
+        thoughts = getattr(usage, "thoughts_token_count", None)
+        if thoughts:
+            output_tokens = (output_tokens or 0) + thoughts
+        return BackendResponse(text=text, input_tokens=input_tokens, output_tokens=output_tokens)
+
+    def research(self, prompt: str, schema: Optional[dict] = None) -> BackendResponse:
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=self._generate_config(schema),
+        )
+        return self._to_response(response)
+
+    def _submit_batch(self, prompts: List[str], schema: Optional[dict] = None) -> Iterator[ResearchOutcome]:
+        requests = [
+            {
+                "contents": [{"parts": [{"text": p}], "role": "user"}],
+                "config": self._generate_config(schema),
+            }
+            for p in prompts
+        ]
+        job = self.client.batches.create(
+            model=self.model,
+            src=requests,
+            config={"display_name": "whocite-research"},
+        )
+        print(f"  Submitted Gemini batch job {job.name} with {len(prompts)} requests.")
+
+        done_states = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+        while job.state.name not in done_states:
+            time.sleep(self.poll_interval)
+            job = self.client.batches.get(name=job.name)
+            print(f"  Batch job state: {job.state.name}")
+
+        if job.state.name != "JOB_STATE_SUCCEEDED":
+            error = RuntimeError(f"Gemini batch job {job.name} ended in {job.state.name}")
+            for i in range(len(prompts)):
+                yield i, None, error
+            return
+
+        for i, inline in enumerate(job.dest.inlined_responses):
+            if inline.response:
+                yield i, self._to_response(inline.response), None
+            else:
+                yield i, None, RuntimeError(str(inline.error))
+
+
+class OpenAICompatibleBackend(ResearchBackend):
+    """OpenAI, Azure OpenAI and any server speaking the chat completions API."""
+
+    name = "openai"
+    max_concurrency = 8
+    poll_interval = 60
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        import openai
+
+        api_type = settings.api_type.lower()
+        # config.example.toml lists the full endpoint; the SDK wants the API root
+        base_url = re.sub(r"/chat/completions/?$", "", settings.base_url)
+        if api_type == "azure":
+            self.client = openai.AzureOpenAI(
+                api_key=settings.api_key,
+                api_version=settings.api_version,
+                azure_endpoint=base_url,
+            )
+        else:
+            self.client = openai.OpenAI(api_key=settings.api_key, base_url=base_url)
+        first_party = api_type == "openai" and "api.openai.com" in base_url
+        # Only the first-party OpenAI endpoint exposes /v1/batches
+        self.supports_batch = first_party
+        # Third-party OpenAI-compatible servers (e.g. DeepSeek) only offer JSON mode
+        self.json_schema = first_party or api_type in ("azure", "ollama")
+
+    def _request_body(self, prompt: str, schema: Optional[dict] = None) -> dict:
+        body = {
+            "model": self.settings.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.settings.temperature,
+            "max_completion_tokens": self.settings.max_completion_tokens,
+        }
+        if schema and self.json_schema:
+            body["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "research_result", "schema": schema, "strict": True},
+            }
+        elif schema:
+            body["response_format"] = {"type": "json_object"}
+        return body
+
+    @staticmethod
+    def _to_response(completion: dict) -> BackendResponse:
+        usage = completion.get("usage") or {}
+        return BackendResponse(
+            text=completion["choices"][0]["message"].get("content") or "",
+            input_tokens=usage.get("prompt_tokens"),
+            output_tokens=usage.get("completion_tokens"),
+        )
+
+    def research(self, prompt: str, schema: Optional[dict] = None) -> BackendResponse:
+        completion = self.client.chat.completions.create(**self._request_body(prompt, schema))
+        return self._to_response(completion.model_dump())
+
+    def _submit_batch(self, prompts: List[str], schema: Optional[dict] = None) -> Iterator[ResearchOutcome]:
+        lines = [
+            json.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._request_body(p, schema),
+            })
+            for i, p in enumerate(prompts)
+        ]
+        batch_file = self.client.files.create(
+            file=("whocite_research.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch",
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        print(f"  Submitted OpenAI batch {batch.id} with {len(prompts)} requests.")
+
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(self.poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+            print(f"  Batch status: {batch.status}")
+
+        seen = set()
+        if batch.output_file_id:
+            for line in self.client.files.content(batch.output_file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                i = int(item["custom_id"])
+                seen.add(i)
+                response = item.get("response") or {}
+                if response.get("status_code") == 200:
+                    yield i, self._to_response(response["body"]), None
+                else:
+                    yield i, None, RuntimeError(str(item.get("error") or response))
+
+        for i in range(len(prompts)):
+            if i not in seen:
+                yield i, None, RuntimeError(f"OpenAI batch {batch.id} ended in {batch.status}")
+
+
+class LocalBackend(OpenAICompatibleBackend):
+    """A local model server (Ollama) through its OpenAI-compatible endpoint.
+
+    A single GPU serves requests one after another, so requests are sent one
+    at a time; more in flight would only queue them on the server.
+    """
+
+    name = "local"
+    max_concurrency = 1
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.supports_batch = False
+
+
+class FakeBackend(ResearchBackend):
+    """Deterministic offline backend for tests and dry runs.
+
+    The answer depends only on the prompt, so repeated runs produce identical
+    output without network access or API keys.
+    """
+
+    name = "fake"
+    max_concurrency = 16
+    supports_batch = True
+
+    def __init__(self, settings=None, latency: float = 0.0):
+        super().__init__(settings)
+        self.latency = latency
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+    def research(self, prompt: str, schema: Optional[dict] = None) -> BackendResponse:
+        if self.latency:
+            time.sleep(self.latency)
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+        match = re.search(r"^\s*Name:\s*(.*)$", prompt, re.MULTILINE)
+        name = match.group(1).strip() if match else "Unknown"
+        titles = ["Professor", "Associate Professor", "Assistant Professor", "Researcher", "PhD Candidate"]
+        text = json.dumps({
+            "name": name,
+            "affiliation": f"University {int(digest[:4], 16) % 100}",
+            "title": titles[int(digest[4:6], 16) % len(titles)],
+            "link": f"https://example.org/people/{digest[:12]}",
+        })
+        return BackendResponse(text=text, input_tokens=len(prompt) // 4, output_tokens=len(text) // 4)
+
+    def _submit_batch(self, prompts: List[str], schema: Optional[dict] = None) -> Iterator[ResearchOutcome]:
+        for i, prompt in enumerate(prompts):
+            yield i, self.research(prompt, schema), None
+
+
+BACKENDS_BY_API_TYPE = {
+    "google": GeminiBackend,
+    "openai": OpenAICompatibleBackend,
+    "azure": OpenAICompatibleBackend,
+    "ollama": LocalBackend,
+    "fake": FakeBackend,
+}
+
+
+def get_backend(name: str = "gemini") -> ResearchBackend:
+    """
+    Builds the research backend for an [llm.<name>] section of the config.
+    `fake` needs no config section.
+    """
+    if name == "fake":
+        return FakeBackend()
+
+    settings = config.llm.get(name)
+    if settings is None:
+        if name == "gemini":
+            # Step 5 historically ran on GOOGLE_API_KEY alone
+            print("Warning: [llm.gemini] not found in config.")
+            return GeminiBackend()
+        raise ValueError(f"No [llm.{name}] section in config; available: {', '.join(config.llm)}")
+
+    backend_cls = BACKENDS_BY_API_TYPE.get(settings.api_type.lower())
+    if backend_cls is None:
+        raise ValueError(f"Unsupported api_type '{settings.api_type}' for [llm.{name}]")
+    return backend_cls(settings)
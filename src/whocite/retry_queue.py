@@ -0,0 +1,240 @@
+import json
+import os
+import time
+
+from .config import config
+
+QUEUE_FILE = "retry_queue.json"
+# Units of work that can fail independently, in the order `whocite retry` replays them
+KINDS = ["citations", "authors", "research"]
+
+
+def queue_path():
+    return config.OUTPUT_DIR / QUEUE_FILE
+
+
+def load_queue():
+    """Failed units keyed by "<kind>:<key>"."""
+    try:
+        with open(queue_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_queue(queue):
+    path = queue_path()
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(queue, f, indent=2)
+    os.replace(tmp, path)
+
+
+def record_failure(kind, key, error, payload):
+    """
+    Records (or updates) a failed unit of work. `payload` holds whatever the
+    retry needs to re-execute just this unit; the error class and message are
+    kept so the queue shows what went wrong.
+    """
+    queue = load_queue()
+    unit_id = f"{kind}:{key}"
+    previous = queue.get(unit_id, {})
+    queue[unit_id] = {
+        "kind": kind,
+        "key": key,
+        "payload": payload,
+        "error": type(error).__name__,
+        "message": str(error)[:500],
+        "attempts": previous.get("attempts", 0) + 1,
+        "first_failed": previous.get("first_failed", time.strftime("%Y-%m-%d %H:%M:%S")),
+        "last_failed": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    save_queue(queue)
+
+
+def clear_failure(kind, key):
+    queue = load_queue()
+    if queue.pop(f"{kind}:{key}", None) is not None:
+        save_queue(queue)
+
+
+def clear_kind(kind):
+    """Drops every unit of one kind, e.g. when a full run redoes all of that work."""
+    queue = load_queue()
+    kept = {unit_id: unit for unit_id, unit in queue.items() if unit["kind"] != kind}
+    if len(kept) != len(queue):
+        save_queue(kept)
+
+
+def with_backoff(unit, work, max_attempts=3, base_delay=2.0):
+    """
+    Runs `work()` until it succeeds or `max_attempts` runs out, waiting
+    base_delay * 2^n seconds between attempts. Each failure updates the unit
+    in the queue; success removes it. Returns (True, result) or (False, None).
+    """
+    for attempt in range(max_attempts):
+        try:
+            result = work()
+        except Exception as e:
+            record_failure(unit["kind"], unit["key"], e, unit["payload"])
+            print(f"  Attempt {attempt + 1}/{max_attempts} failed: {type(e).__name__}: {e}")
+            if attempt + 1 < max_attempts:
+                time.sleep(base_delay * 2 ** attempt)
+            continue
+        clear_failure(unit["kind"], unit["key"])
+        return True, result
+    return False, None
+
+
+def _retry_citations(units, max_attempts, base_delay):
+    from .artifacts import iter_citations, save_citations
+    from .step1_fetch_citations import fetch_citation_pages, load_api_key
+    from .ingest import paper_key
+
+    api_key = load_api_key()
+    try:
+        entries = list(iter_citations())
+    except FileNotFoundError:
+        entries = []
+    by_key = {paper_key(entry["my_paper"]): entry for entry in entries}
+
+    recovered = 0
+    for unit in units:
+        payload = unit["payload"]
+        entry = by_key.get(unit["key"])
+        if entry is None:
+            print(f"Dropping citations for {unit['key']}: the paper is no longer in the citation data.")
+            clear_failure(unit["kind"], unit["key"])
+            continue
+        print(f"Retrying citations of {unit['key']} from offset {payload['offset']}...")
+        fetched = []
+
+        def work():
+            # Pages that arrive before a failure are kept, so the next attempt resumes after them
+            citations, offset, error = fetch_citation_pages(
+                payload.get("doi"), api_key, payload.get("paper_id"), payload["offset"]
+            )
+            fetched.extend(citations)
+            payload["offset"] = offset
+            if error is not None:
+                raise error
+
+        start = unit["payload"]["offset"]
+        ok, _ = with_backoff(unit, work, max_attempts, base_delay)
+        entry["citations"] = entry["citations"][:start] + fetched
+        # Saved per unit: the queued offset has already moved past these pages
+        save_citations(entries)
+        if ok:
+            recovered += 1
+        time.sleep(1.1)
+
+    return recovered
+
+
+def _retry_authors(units, max_attempts, base_delay):
+    from .artifacts import load_authors, save_authors
+    from .step2_fetch_author_details import fetch_author_batch, load_api_key
+
+    api_key = load_api_key()
+    try:
+        author_map = load_authors()
+    except FileNotFoundError:
+        author_map = {}
+
+    recovered = 0
+    for unit in units:
+        ids = unit["payload"]["ids"]
+        print(f"Retrying author batch of {len(ids)} IDs...")
+        ok, authors = with_backoff(unit, lambda: fetch_author_batch(ids, api_key), max_attempts, base_delay)
+        if ok:
+            author_map.update({a["authorId"]: a for a in authors if "authorId" in a})
+            recovered += 1
+        time.sleep(1.1)
+
+    save_authors(author_map)
+    return recovered
+
+
+def _retry_research(units, max_attempts, base_delay):
+    from .export import read_rows
+    from .research_backends import get_backend
+    from .step5_research_authors import (
+        RESEARCH_SCHEMA, build_research_prompt, enrich_author, parse_research_response, save_csv,
+    )
+
+    output_file = config.OUTPUT_DIR / "high_impact_authors_enriched.csv"
+    rows = list(read_rows(output_file)) if output_file.exists() else []
+    by_key = {(row.get("profile") or row.get("name")): i for i, row in enumerate(rows)}
+    backends = {}
+
+    recovered = 0
+    for unit in units:
+        author = unit["payload"]["author"]
+        name = unit["payload"].get("backend", "gemini")
+        if name not in backends:
+            backends[name] = get_backend(name)
+        backend = backends[name]
+        print(f"Retrying research for {author['name']} ({backend.name})...")
+
+        def work():
+            response = backend.research(build_research_prompt(author), RESEARCH_SCHEMA)
+            result, problem = parse_research_response(response.text)
+            if result is None:
+                raise ValueError(f"invalid output: {problem}")
+            return result, response
+
+        ok, outcome = with_backoff(unit, work, max_attempts, base_delay)
+        if not ok:
+            continue
+        result, response = outcome
+        record = enrich_author(author, result, "ok")
+        record["Input Tokens"] = response.input_tokens
+        record["Output Tokens"] = response.output_tokens
+        key = author["profile"] or author["name"]
+        if key in by_key:
+            rows[by_key[key]] = record
+        else:
+            by_key[key] = len(rows)
+            rows.append(record)
+        recovered += 1
+
+    save_csv(rows, output_file)
+    return recovered
+
+
+RETRY_HANDLERS = {
+    "citations": _retry_citations,
+    "authors": _retry_authors,
+    "research": _retry_research,
+}
+
+# What to rerun once a kind of unit has been recovered
+NEXT_STEPS = {
+    "citations": "whocite fetch-authors --only-missing && whocite analyze && whocite filter",
+    "authors": "whocite analyze && whocite filter",
+    "research": "whocite merge",
+}
+
+
+def main(kinds=None, max_attempts=3, base_delay=2.0):
+    """Re-executes only the failed units recorded in the retry queue."""
+    queue = load_queue()
+    if not queue:
+        print("Retry queue is empty.")
+        return
+
+    for kind in KINDS:
+        if kinds and kind not in kinds:
+            continue
+        units = [unit for unit in queue.values() if unit["kind"] == kind]
+        if not units:
+            continue
+        print(f"\n{len(units)} failed {kind} units:")
+        recovered = RETRY_HANDLERS[kind](units, max_attempts, base_delay)
+        print(f"Recovered {recovered}/{len(units)} {kind} units.")
+        if recovered:
+            print(f"  Refresh downstream results with: {NEXT_STEPS[kind]}")
+
+    remaining = load_queue()
+    if remaining:
+        print(f"\n{len(remaining)} units still failing; they stay queued for the next `whocite retry`.")
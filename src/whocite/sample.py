@@ -0,0 +1,260 @@
+import json
+import math
+import time
+from contextlib import contextmanager
+
+from .config import config
+from .export import read_rows
+from .ingest import PAPER_BATCH_SIZE
+from .session import session
+from .step4_filter_authors import TOP_N, author_key
+
+ESTIMATE_FILE = "sample_estimate.json"
+STRATA = 5
+AUTHOR_BATCH_SIZE = 50  # ids per /author/batch request in step 2
+
+# Outputs whose size grows with the number of citations or citing authors;
+# the remaining reports are bounded by the top-N author cut
+PER_CITATION_OUTPUTS = ["citations.jsonl.gz", "citations_analysis.csv", "citations_analysis.json"]
+PER_AUTHOR_OUTPUTS = ["authors.jsonl.gz"]
+FIXED_OUTPUTS = [
+    "high_impact_citing_authors.csv",
+    "high_impact_authors_enriched.csv",
+    "research_raw_responses.jsonl.gz",
+]
+
+
+def estimate_path():
+    return config.OUTPUT_DIR / ESTIMATE_FILE
+
+
+def stratified_sample(items, fraction, key, strata=STRATA):
+    """
+    Deterministic stratified sample of about `fraction` of `items`: the items
+    are ranked by `key`, cut into `strata` equal-size bands and every band
+    contributes proportionally, at least one item. Keeps the input order.
+    """
+    if not items or fraction >= 1:
+        return list(items)
+    ranked = sorted(range(len(items)), key=lambda i: key(items[i]), reverse=True)
+    strata = max(1, min(strata, len(ranked)))
+    chosen = set()
+    for s in range(strata):
+        band = ranked[s * len(ranked) // strata:(s + 1) * len(ranked) // strata]
+        take = max(1, round(len(band) * fraction))
+        # Evenly spaced picks cover the band from its most to its least cited item
+        chosen.update(band[int(k * len(band) / take)] for k in range(take))
+    return [item for i, item in enumerate(items) if i in chosen]
+
+
+class Meter:
+    """Wall time and Semantic Scholar requests per pipeline phase."""
+
+    def __init__(self):
+        self.phases = {}
+        self._requests = 0
+
+    def _count(self, response, *args, **kwargs):
+        self._requests += 1
+
+    @contextmanager
+    def phase(self, name):
+        session.hooks["response"].append(self._count)
+        requests_before = self._requests
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            session.hooks["response"].remove(self._count)
+            self.phases[name] = {
+                "seconds": time.monotonic() - start,
+                "requests": self._requests - requests_before,
+            }
+
+
+def _file_size(filename):
+    path = config.OUTPUT_DIR / filename
+    return path.stat().st_size if path.exists() else 0
+
+
+def _count_citations_and_authors():
+    from .artifacts import iter_citations
+
+    citations = 0
+    author_ids = set()
+    for entry in iter_citations():
+        for citation in entry.get("citations", []):
+            citations += 1
+            for author in (citation.get("citingPaper") or {}).get("authors") or []:
+                if author.get("authorId"):
+                    author_ids.add(author["authorId"])
+    return citations, len(author_ids)
+
+
+def _count_high_impact_authors():
+    path = config.OUTPUT_DIR / "high_impact_citing_authors.csv"
+    if not path.exists():
+        return 0
+    return len({author_key(row) for row in read_rows(path)})
+
+
+def extrapolate(fraction, full_plan, plan, meter, budget, backend, research_limit=None):
+    """
+    Scales what the sampled run measured up to the full bibliography.
+
+    Citation requests follow from the preflight's page counts, which are
+    exact; everything else is a rate measured on the sample (per citation,
+    per author, per request) times the size of the full run. Authors are
+    extrapolated per citation, which overcounts authors who cite several
+    papers, so author requests are an upper bound.
+    """
+    phases = meter.phases
+    sample_citations, sample_authors = _count_citations_and_authors()
+    sample_pages = sum(item["pages"] or 1 for item in plan)
+    full_pages = sum(item["pages"] or 1 for item in full_plan)
+    full_citations = sum(item["citation_count"] or 0 for item in full_plan)
+    if not full_citations:
+        # Preflight failed: scale by the number of papers instead
+        full_citations = sample_citations * len(full_plan) / max(len(plan), 1)
+    scale = full_citations / sample_citations if sample_citations else 0
+
+    def per_request(name):
+        phase = phases.get(name, {})
+        return phase.get("seconds", 0) / phase["requests"] if phase.get("requests") else 0
+
+    # The preflight's /paper/batch lookups are made once whatever the sample size
+    preflight = math.ceil(len(full_plan) / PAPER_BATCH_SIZE)
+    paging = max(phases.get("fetch-citations", {}).get("requests", 0) - preflight, 0)
+    citation_requests = preflight + (math.ceil(full_pages * paging / sample_pages) if sample_pages else 0)
+    full_authors = math.ceil(sample_authors * scale)
+    author_requests = math.ceil(full_authors / AUTHOR_BATCH_SIZE)
+    local_seconds = sum(phases.get(name, {}).get("seconds", 0) for name in ("analyze", "filter", "merge"))
+
+    sample_high_impact = _count_high_impact_authors()
+    full_high_impact = min(research_limit or TOP_N, TOP_N, math.ceil(sample_high_impact / fraction))
+    researched = budget.requests if budget else 0
+    research = {"authors": full_high_impact, "input_tokens": None, "output_tokens": None, "cost": None}
+    if researched:
+        research["input_tokens"] = round(budget.input_tokens / researched * full_high_impact)
+        research["output_tokens"] = round(budget.output_tokens / researched * full_high_impact)
+        if budget.has_pricing:
+            research["cost"] = round(budget.cost / researched * full_high_impact, 4)
+        research["seconds"] = phases["research"]["seconds"] / researched * full_high_impact
+
+    outputs = {name: round(_file_size(name) * scale) for name in PER_CITATION_OUTPUTS}
+    author_scale = full_authors / sample_authors if sample_authors else 0
+    outputs.update({name: round(_file_size(name) * author_scale) for name in PER_AUTHOR_OUTPUTS})
+    outputs.update({name: _file_size(name) for name in FIXED_OUTPUTS})
+
+    return {
+        "fraction": fraction,
+        "backend": backend,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "sample": {
+            "papers": len(plan),
+            "citation_pages": sample_pages,
+            "citations": sample_citations,
+            "authors": sample_authors,
+            "researched_authors": researched,
+            "phases": phases,
+        },
+        "full": {
+            "papers": len(full_plan),
+            "citation_pages": full_pages,
+            "citations": round(full_citations),
+            "authors": full_authors,
+            "citation_requests": citation_requests,
+            "citation_seconds": citation_requests * per_request("fetch-citations"),
+            "author_requests": author_requests,
+            "author_seconds": author_requests * per_request("fetch-authors"),
+            "local_seconds": local_seconds * scale,
+            "research": research,
+            "output_bytes": outputs,
+        },
+    }
+
+
+def _duration(seconds):
+    if seconds is None:
+        return "n/a"
+    hours, rest = divmod(int(seconds), 3600)
+    return f"{hours}h {rest // 60:02d}m" if hours else f"{rest // 60}m {rest % 60:02d}s"
+
+
+def _size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def print_estimate(estimate):
+    sample, full = estimate["sample"], estimate["full"]
+    research = full["research"]
+    print(f"\nEstimate for the full run, from a {estimate['fraction']:.0%} sample "
+          f"({sample['papers']} of {full['papers']} papers):")
+    print(f"  Citations:      {full['citations']} in {full['citation_pages']} pages, "
+          f"~{full['citation_requests']} requests, {_duration(full['citation_seconds'])}")
+    print(f"  Authors:        up to {full['authors']}, ~{full['author_requests']} requests, "
+          f"{_duration(full['author_seconds'])}")
+    print(f"  Local steps:    {_duration(full['local_seconds'])}")
+    if research["input_tokens"] is None:
+        print(f"  Research:       {research['authors']} authors (no usage measured in the sample)")
+    else:
+        cost = f"${research['cost']:.2f}" if research["cost"] is not None else "no prices configured"
+        print(f"  Research:       {research['authors']} authors, {research['input_tokens']} input / "
+              f"{research['output_tokens']} output tokens, {cost}, {_duration(research['seconds'])}")
+    total = full["citation_seconds"] + full["author_seconds"] + full["local_seconds"] + research.get("seconds", 0)
+    print(f"  Wall time:      ~{_duration(total)}")
+    print(f"  Output size:    ~{_size(sum(full['output_bytes'].values()))}")
+    for name, size in full["output_bytes"].items():
+        if size:
+            print(f"    {name}: {_size(size)}")
+
+
+def run_sample(fraction, backend="gemini", workers=1, research_limit=None):
+    """
+    Runs the whole pipeline on a stratified sample of the bibliography,
+    measures it, and writes the extrapolated cost of the full run to
+    sample_estimate.json. `research_limit` is the full run's research limit;
+    the sample researches the same fraction of it. The sampled citations, author profiles and
+    research stay on disk for the next full `run-all` to reuse.
+    """
+    from .step1_fetch_citations import main as fetch_citations
+    from .step2_fetch_author_details import main as fetch_details
+    from .step3_analyze_results import main as analyze
+    from .step4_filter_authors import main as filter_authors
+    from .step5_research_authors import main as research
+    from .step6_merge_results import main as merge
+
+    meter = Meter()
+    print(f"Step 1: Fetching Citations for a {fraction:.0%} sample...")
+    with meter.phase("fetch-citations"):
+        full_plan, plan = fetch_citations(sample_fraction=fraction)
+    print("\nStep 2: Fetching Author Details...")
+    with meter.phase("fetch-authors"):
+        fetch_details()
+    print("\nStep 3: Analyzing Results...")
+    with meter.phase("analyze"):
+        analyze(workers=workers)
+    print("\nStep 4: Filtering Authors...")
+    with meter.phase("filter"):
+        filter_authors(workers=workers)
+
+    print("\nStep 5: Researching a sample of the high-impact authors...")
+    to_research = _count_high_impact_authors()
+    if research_limit:
+        to_research = min(to_research, research_limit)
+    limit = max(1, math.ceil(fraction * to_research))
+    with meter.phase("research"):
+        budget = research(limit=limit, backend=backend)
+    print("\nStep 6: Merging Results...")
+    with meter.phase("merge"):
+        merge()
+
+    estimate = extrapolate(fraction, full_plan, plan, meter, budget, backend, research_limit)
+    with open(estimate_path(), "w", encoding="utf-8") as f:
+        json.dump(estimate, f, indent=2)
+    print_estimate(estimate)
+    print(f"\nSaved to {ESTIMATE_FILE}. The next `whocite run-all` reuses the sampled results.")
+    return estimate
@@ -0,0 +1,5 @@
+import requests
+
+# One pooled session for every Semantic Scholar call, so consecutive requests
+# (and consecutive cycles in `whocite watch`) reuse TCP/TLS connections
+session = requests.Session()
@@ -1,10 +1,12 @@
 import requests
-import bibtexparser
 import time
 import urllib.parse
-import json
 
+from .artifacts import CITATIONS_FILE, append_jsonl, citations_path, iter_citations, save_citations
 from .config import config
+from .ingest import load_bib_entries, paper_key, plan_citation_fetches, resolve_missing_dois
+from .retry_queue import clear_failure, clear_kind, load_queue, record_failure
+from .session import session
 
 def load_api_key(filename="semantic_scholar_api_key.txt"):
     filepath = config.CONFIG_DIR / filename
@@ -17,15 +19,40 @@ def load_api_key(filename="semantic_scholar_api_key.txt"):
 
 def load_papers_from_bib(filename="my.bib"):
     bib_path = config.PROJECT_ROOT / filename
-    with open(bib_path, "r", encoding="utf-8") as bibtex_file:
-        bib_database = bibtexparser.load(bibtex_file)
-    return bib_database.entries
+    return load_bib_entries(bib_path)
 
-def fetch_citations(doi, api_key=None):
-    if not doi:
-        return []
+def failure_key(doi, paper_id):
+    # Same identity as ingest.paper_key, so a retry finds the paper's entry again
+    return "DOI:" + doi.lower() if doi else paper_id
+
+def fetch_citations(doi, api_key=None, paper_id=None):
+    """
+    Fetches citations by DOI, or by Semantic Scholar paper ID when there is no DOI.
+    When pagination fails partway, the citations fetched so far are returned
+    and the failed page is queued for `whocite retry`.
+    """
+    citations, offset, error = fetch_citation_pages(doi, api_key, paper_id)
+    if doi or paper_id:
+        if error is not None:
+            record_failure("citations", failure_key(doi, paper_id), error, {
+                "doi": doi, "paper_id": paper_id, "offset": offset,
+            })
+        else:
+            clear_failure("citations", failure_key(doi, paper_id))
+    return citations
+
+def fetch_citation_pages(doi, api_key=None, paper_id=None, offset=0):
+    """
+    Pages through the citations starting at `offset`. Returns
+    (citations, offset, error): `error` is the exception that stopped
+    pagination at `offset`, or None once every page was fetched.
+    """
+    if not doi and not paper_id:
+        return [], offset, None
         
-    paper_id = "DOI:" + urllib.parse.quote(doi)
+    if doi:
+        paper_id = "DOI:" + urllib.parse.quote(doi)
+    label = f"DOI {doi}" if doi else f"paper {paper_id}"
     base = f"https://api.semanticscholar.org/graph/v1/paper/{paper_id}/citations"
     
     # Try fetching with detailed author fields first (including affiliations)
@@ -36,7 +63,6 @@ def fetch_citations(doi, api_key=None):
     
     current_fields = detailed_fields
     limit = 1000
-    offset = 0
     
     headers = {}
     if api_key:
@@ -47,16 +73,16 @@ def fetch_citations(doi, api_key=None):
     while True:
         params = {"fields": current_fields, "limit": limit, "offset": offset}
         try:
-            r = requests.get(base, params=params, headers=headers, timeout=60)
+            r = session.get(base, params=params, headers=headers, timeout=60)
             
             # If we get a 400 with detailed fields, try falling back to simple fields
             if r.status_code == 400 and current_fields == detailed_fields:
-                print(f"  Warning: 400 Bad Request with detailed fields for DOI {doi}. Retrying with simple fields...")
+                print(f"  Warning: 400 Bad Request with detailed fields for {label}. Retrying with simple fields...")
                 current_fields = simple_fields
                 continue
                 
             if r.status_code == 404:
-                print(f"Paper with DOI {doi} not found in Semantic Scholar.")
+                print(f"Paper with {label} not found in Semantic Scholar.")
                 break
                 
             r.raise_for_status()
@@ -74,49 +100,106 @@ def fetch_citations(doi, api_key=None):
             time.sleep(1.1) 
             
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching citations for DOI {doi}: {e}")
+            print(f"Error fetching citations for {label}: {e}")
             # If we failed with detailed fields, try once with simple fields unless we already did
             if current_fields == detailed_fields:
                  print("  Retrying with simple fields due to error...")
                  current_fields = simple_fields
                  time.sleep(1.1)
                  continue
-            break
+            return all_citations, offset, e
             
-    return all_citations
+    return all_citations, offset, None
+
+def load_reusable(plan):
+    """
+    Entries of the current citation data that need no new fetch: the paper's
+    citation count still matches the preflight and no page of it is queued
+    for retry.
+    """
+    try:
+        previous = {paper_key(entry["my_paper"]): entry for entry in iter_citations()}
+    except FileNotFoundError:
+        return {}
+    queued = load_queue()
+    reusable = {}
+    for item in plan:
+        paper = item["paper"]
+        entry = previous.get(paper_key(paper))
+        if (
+            entry is not None
+            and item["citation_count"] is not None
+            and entry.get("citation_count") == item["citation_count"]
+            and f"citations:{failure_key(paper.get('doi'), paper.get('s2_paper_id'))}" not in queued
+        ):
+            reusable[paper_key(paper)] = entry
+    return reusable
 
-def main():
+def main(sample_fraction=None, reuse_existing=False):
+    """
+    Fetches citations for every paper in my.bib. With `sample_fraction`
+    only a stratified sample of the papers is fetched; with `reuse_existing`
+    papers whose citation data is still current are kept instead of fetched
+    again. Returns (full plan, plan that was run).
+    """
     api_key = load_api_key()
     papers = load_papers_from_bib()
     
     total_papers = len(papers)
     print(f"Found {total_papers} papers in bib file.")
+    resolve_missing_dois(papers, api_key)
+    
+    # Most-cited papers first; unknown and uncited papers cost no citation requests
+    plan, dropped = plan_citation_fetches(papers, api_key)
+    for paper, reason in dropped:
+        print(f"  Skipping {paper.get('title', 'Unknown Title')}: {reason}")
+    planned_pages = sum(item["pages"] or 1 for item in plan)
+    print(f"Planned {len(plan)} papers, ~{planned_pages} citation pages ({len(dropped)} skipped).")
     
-    all_papers_data = []
+    full_plan = plan
+    if sample_fraction:
+        from .sample import stratified_sample
+        plan = stratified_sample(plan, sample_fraction, key=lambda item: item["citation_count"] or 0)
+        print(f"Sampling {len(plan)} of {len(full_plan)} papers across citation-count strata.")
+    reusable = load_reusable(plan) if reuse_existing else {}
+    if reusable:
+        print(f"Reusing current citation data for {len(reusable)} papers.")
     
-    for i, paper in enumerate(papers):
+    # Each paper is appended as soon as it is fetched, so an interrupted run
+    # keeps what it already has. A full run supersedes earlier failed pages.
+    save_citations([])
+    clear_kind("citations")
+    saved = 0
+    
+    for i, item in enumerate(plan):
+        paper = item["paper"]
         doi = paper.get("doi")
+        s2_paper_id = paper.get("s2_paper_id")
         title = paper.get("title", "Unknown Title")
         
-        print(f"\nProcessing {i+1}/{total_papers}: {title}")
-        if not doi:
-            print("  Skipping: No DOI found.")
+        print(f"\nProcessing {i+1}/{len(plan)}: {title}")
+        if paper_key(paper) in reusable:
+            print("  Unchanged since the last fetch; reusing.")
+            append_jsonl(citations_path(), reusable[paper_key(paper)])
+            saved += 1
             continue
+        if item["citation_count"] is not None:
+            print(f"  Expected citations: {item['citation_count']} ({item['pages']} pages)")
             
-        print(f"  DOI: {doi}")
-        citations = fetch_citations(doi, api_key)
+        if doi:
+            print(f"  DOI: {doi}")
+        else:
+            print(f"  Semantic Scholar ID: {s2_paper_id}")
+        citations = fetch_citations(doi, api_key, paper_id=s2_paper_id)
         print(f"  Total citations fetched: {len(citations)}")
         
         paper_data = {
             "my_paper": paper,
+            "citation_count": item["citation_count"],
             "citations": citations
         }
-        all_papers_data.append(paper_data)
-        
-        # Save intermediate results
-        output_path = config.OUTPUT_DIR / "citations.json"
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(all_papers_data, f, indent=2)
+        append_jsonl(citations_path(), paper_data)
+        saved += 1
             
         if citations:
             titles = [
@@ -129,7 +212,8 @@ def main():
         # Add a delay between papers to respect rate limits
         time.sleep(1.1)
 
-    print(f"\nSaved citation data for {len(all_papers_data)} papers to citations.json")
+    print(f"\nSaved citation data for {saved} papers to {CITATIONS_FILE}")
+    return full_plan, plan
 
 if __name__ == "__main__":
     main()
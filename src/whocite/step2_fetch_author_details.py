@@ -1,13 +1,10 @@
-import json
 import requests
 import time
 
+from .artifacts import AUTHORS_FILE, iter_citations, load_authors, save_authors
 from .config import config
-
-def load_citations(filename="citations.json"):
-    filepath = config.OUTPUT_DIR / filename
-    with open(filepath, "r", encoding="utf-8") as f:
-        return json.load(f)
+from .retry_queue import clear_kind, load_queue, record_failure, save_queue
+from .session import session
 
 def load_api_key(filename="semantic_scholar_api_key.txt"):
     filepath = config.CONFIG_DIR / filename
@@ -17,7 +14,8 @@ def load_api_key(filename="semantic_scholar_api_key.txt"):
     except FileNotFoundError:
         return None
 
-def fetch_authors_batch(author_ids, api_key=None):
+def fetch_author_batch(batch_ids, api_key=None):
+    """One /author/batch request; raises requests exceptions to the caller."""
     url = "https://api.semanticscholar.org/graph/v1/author/batch"
     fields = "name,affiliations,hIndex,citationCount,url,externalIds"
     
@@ -25,6 +23,12 @@ def fetch_authors_batch(author_ids, api_key=None):
     if api_key:
         headers["x-api-key"] = api_key
 
+    r = session.post(url, json={"ids": batch_ids}, params={"fields": fields}, headers=headers, timeout=30)
+    r.raise_for_status()
+    # The batch API returns a list of author objects, might include None if not found
+    return [a for a in r.json() if a]
+
+def fetch_authors_batch(author_ids, api_key=None):
     # Semantic Scholar Batch API typically accepts up to 1000 IDs, but let's be safe with 100 or 50
     batch_size = 50
     all_authors = []
@@ -34,33 +38,42 @@ def fetch_authors_batch(author_ids, api_key=None):
 
     for i in range(0, total, batch_size):
         batch_ids = author_ids[i:i+batch_size]
-        payload = {"ids": batch_ids}
-        params = {"fields": fields}
         
         try:
-            r = requests.post(url, json=payload, params=params, headers=headers, timeout=30)
-            r.raise_for_status()
-            batch_data = r.json()
-            
-            # The batch API returns a list of author objects, might include None if not found
-            valid_authors = [a for a in batch_data if a]
-            all_authors.extend(valid_authors)
+            all_authors.extend(fetch_author_batch(batch_ids, api_key))
             
             print(f"  Processed {min(i+batch_size, total)}/{total}")
             
             # Rate limit sleep
             time.sleep(1.1) 
             
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # Queued for `whocite retry` instead of being lost
             print(f"Error fetching batch {i}: {e}")
+            record_failure("authors", f"{batch_ids[0]}+{len(batch_ids)}", e, {"ids": batch_ids})
             
     return all_authors
 
-def main():
+def clear_fetched_batches(author_map):
+    """Drops queued author batches whose IDs have all been fetched since they failed."""
+    queue = load_queue()
+    kept = {
+        unit_id: unit for unit_id, unit in queue.items()
+        if unit["kind"] != "authors" or not all(a_id in author_map for a_id in unit["payload"]["ids"])
+    }
+    if len(kept) != len(queue):
+        save_queue(kept)
+        print(f"  Cleared {len(queue) - len(kept)} queued author batches fetched by this run.")
+
+def main(only_missing=False):
     api_key = load_api_key()
-    data = load_citations()
+    try:
+        data = iter_citations()
+    except FileNotFoundError:
+        print("Error: no citation data found. Please run `whocite fetch-citations` first.")
+        return
     
-    # Extract unique author IDs
+    # Extract unique author IDs, streaming one paper at a time
     unique_author_ids = set()
     for entry in data:
         citations = entry.get("citations", [])
@@ -74,22 +87,38 @@ def main():
     sorted_ids = sorted(list(unique_author_ids))
     print(f"Found {len(sorted_ids)} unique authors.")
     
+    # Incremental mode keeps known profiles and only fetches new author IDs
+    author_map = {}
+    if only_missing:
+        try:
+            author_map = load_authors()
+        except FileNotFoundError:
+            pass
+        sorted_ids = [a_id for a_id in sorted_ids if a_id not in author_map]
+        print(f"  {len(sorted_ids)} of them are not in {AUTHORS_FILE} yet.")
+    else:
+        # Every ID is fetched again, so earlier failed batches are moot
+        clear_kind("authors")
+    
     if not sorted_ids:
         print("No authors found to fetch.")
+        if only_missing:
+            clear_fetched_batches(author_map)
         return
 
     author_details_list = fetch_authors_batch(sorted_ids, api_key)
     
     # Convert list to dict for easier lookup
-    author_map = {a["authorId"]: a for a in author_details_list if a and "authorId" in a}
+    author_map.update({a["authorId"]: a for a in author_details_list if a and "authorId" in a})
     
     print(f"Successfully fetched details for {len(author_map)} authors.")
     
     # Save to file
-    output_path = config.OUTPUT_DIR / "authors.json"
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(author_map, f, indent=2)
-    print("Saved author details to authors.json")
+    save_authors(author_map)
+    if only_missing:
+        # IDs from earlier failed batches count as missing, so they may have been fetched now
+        clear_fetched_batches(author_map)
+    print(f"Saved author details to {AUTHORS_FILE}")
 
 if __name__ == "__main__":
     main()
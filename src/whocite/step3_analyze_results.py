@@ -1,23 +1,53 @@
 import json
-import csv
+from collections import deque
+from itertools import islice
 
+from .artifacts import iter_citations, load_authors
 from .config import config
+from .export import CsvSink, JsonArraySink, encode_csv, encode_json_items, write_rows
+from .network import NETWORK_COLUMNS, author_network
+from .parallel import process_pool, resolve_workers, split_weighted
 
-def load_json(filename):
-    filepath = config.OUTPUT_DIR / filename
-    try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
+# Shards hold at most about this many citations, so large libraries get more,
+# smaller shards instead of a few huge ones
+SHARD_CITATIONS = 20000
+MAX_SHARDS_IN_FLIGHT = 2  # per worker: one being analyzed, one queued
 
-def main():
-    citations_data = load_json("citations.json")
-    # authors_json is a dict mapping authorId -> details
-    authors_map = load_json("authors.json")
-    
-    analysis_results = []
-    
+ANALYSIS_FIELDS = [
+    "My Paper DOI",
+    "My Paper Title",
+    "Citing Paper Title",
+    "Citing Paper Year",
+    "Citing Paper Venue",
+    "Citing Author Name",
+    "Citing Author Affiliation",
+    "Citing Author h-index",
+    "Citing Author Total Citations",
+    "Citing Author Profile",
+    *NETWORK_COLUMNS.values(),
+]
+
+# Only these profile fields end up in the analysis
+AUTHOR_FIELDS = ["affiliations", "hIndex", "citationCount", "url"]
+CITING_PAPER_FIELDS = ["title", "year", "venue", "url", "authors"]
+
+def slim_entry(entry):
+    """Drops abstracts, contexts and other fields the analysis does not read."""
+    return {
+        "my_paper": entry.get("my_paper", {}),
+        "citations": [
+            {"citingPaper": {k: v for k, v in citation["citingPaper"].items() if k in CITING_PAPER_FIELDS}}
+            for citation in entry.get("citations", [])
+            if citation.get("citingPaper")
+        ],
+    }
+
+def iter_analysis_rows(citations_data, authors_map, network=None):
+    """
+    Yields one row per (citation, citing author) pair. `network` maps author
+    IDs to the metrics of network.author_network().
+    """
+    network = network or {}
     for entry in citations_data:
         my_paper = entry.get("my_paper", {})
         my_title = my_paper.get("title", "Unknown Title")
@@ -94,23 +124,106 @@ def main():
                     "Citing Author Total Citations": a_info["total_citations"],
                     "Citing Author Profile": a_info["profile_url"]
                 }
-                analysis_results.append(row)
+                metrics = network.get(a_info["id"], {})
+                for metric, column in NETWORK_COLUMNS.items():
+                    row[column] = metrics.get(metric, "")
+                yield row
+
+def _analyze_shard(shard):
+    """Worker: encodes the rows of a slice of the citation data for the CSV and JSON outputs."""
+    rows = list(iter_analysis_rows(*shard))
+    return len(rows), encode_csv(rows, ANALYSIS_FIELDS), encode_json_items(rows)
+
+def _weigh(citations_data, weights):
+    """Passes the papers through, appending each one's shard weight to `weights`."""
+    for entry in citations_data:
+        weights.append(len(entry.get("citations", [])) + 1)
+        yield entry
+
+def _shards(citations_data, authors_map, network, sizes):
+    """
+    Consecutive slices of the streamed papers, `sizes[i]` papers in the i-th,
+    each trimmed and carrying only the authors it needs.
+    """
+    citations_data = iter(citations_data)
+    for size in sizes:
+        entries = [slim_entry(entry) for entry in islice(citations_data, size)]
+        needed = {
+            author.get("authorId")
+            for entry in entries
+            for citation in entry["citations"]
+            for author in citation["citingPaper"].get("authors", [])
+        }
+        yield (
+            entries,
+            {a_id: authors_map[a_id] for a_id in needed if a_id in authors_map},
+            {a_id: network[a_id] for a_id in needed if a_id in network},
+        )
 
-    # Save to JSON
+def analyze_parallel(citations_data, weights, authors_map, network, json_out, csv_out, workers):
+    """
+    Fans the analysis out over worker processes. Shards are balanced by the
+    per-paper `weights` of an earlier pass, built from the stream only as
+    workers free up, and written back in input order, so the files match a
+    sequential run byte for byte while the parent holds at most
+    MAX_SHARDS_IN_FLIGHT shards per worker.
+    """
+    shards = max(workers * 4, -(-sum(weights) // SHARD_CITATIONS))
+    sizes = [len(group) for group in split_weighted(range(len(weights)), weights, shards)]
+    sinks = [CsvSink(csv_out, ANALYSIS_FIELDS), JsonArraySink(json_out)]
+    in_flight = deque()
+    count = 0
+
+    def write(future):
+        nonlocal count
+        shard_count, csv_text, json_text = future.result()
+        sinks[0].write_encoded(csv_text)
+        sinks[1].write_encoded(json_text)
+        count += shard_count
+
+    try:
+        with process_pool(workers) as pool:
+            for shard in _shards(citations_data, authors_map, network, sizes):
+                in_flight.append(pool.submit(_analyze_shard, shard))
+                if len(in_flight) >= workers * MAX_SHARDS_IN_FLIGHT:
+                    write(in_flight.popleft())
+            while in_flight:
+                write(in_flight.popleft())
+    finally:
+        for sink in sinks:
+            sink.close()
+    return count
+
+def main(workers=1):
+    # Papers are read one at a time; authors_map is a dict mapping authorId -> details
+    weights = []
+    try:
+        # Network metrics need every paper before the first row, so they take their own
+        # pass; it also weighs the papers for sharding
+        network = author_network(_weigh(iter_citations(), weights))
+        citations_data = iter_citations()
+    except FileNotFoundError:
+        citations_data, network = iter([]), {}
+    try:
+        authors_map = load_authors(AUTHOR_FIELDS)
+    except FileNotFoundError:
+        authors_map = {}
+    workers = resolve_workers(workers)
+    
     json_out = config.OUTPUT_DIR / "citations_analysis.json"
-    with open(json_out, "w", encoding="utf-8") as f:
-        json.dump(analysis_results, f, indent=2)
-        
-    # Save to CSV
-    if analysis_results:
-        headers = list(analysis_results[0].keys())
-        csv_out = config.OUTPUT_DIR / "citations_analysis.csv"
-        with open(csv_out, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=headers)
-            writer.writeheader()
-            writer.writerows(analysis_results)
+    csv_out = config.OUTPUT_DIR / "citations_analysis.csv"
+    
+    if workers > 1 and len(weights) > 1:
+        print(f"Analyzing {len(weights)} papers with {workers} worker processes...")
+        count = analyze_parallel(citations_data, weights, authors_map, network, json_out, csv_out, workers)
+    else:
+        # Stream rows into JSON and CSV together instead of materializing the full list
+        count = write_rows(iter_analysis_rows(citations_data, authors_map, network), [json_out, csv_out])
+    if not count:
+        with open(json_out, "w", encoding="utf-8") as f:
+            json.dump([], f)
             
-    print(f"Analysis complete. Processed {len(analysis_results)} author-citation records.")
+    print(f"Analysis complete. Processed {count} author-citation records.")
     print("Saved to citations_analysis.json and citations_analysis.csv")
 
 if __name__ == "__main__":
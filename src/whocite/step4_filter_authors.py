@@ -1,82 +1,116 @@
 import csv
+from contextlib import nullcontext
 
 from .config import config
+from .export import read_rows, write_rows
+from .parallel import csv_byte_ranges, process_pool, read_csv_range, resolve_workers
 
-def main():
+TOP_N = 30
+
+def author_key(row):
+    # Identify author uniquely
+    profile = row.get("Citing Author Profile", "")
+    name = row.get("Citing Author Name", "")
+    return profile if profile else name
+
+def author_count(row):
+    try:
+        count_str = row.get("Citing Author Total Citations", "0")
+        if not count_str: count_str = "0"
+        return int(count_str)
+    except ValueError:
+        return 0
+
+def papers_cited(row):
+    # How many of our papers the author cites (network column); breaks citation-count ties
+    try:
+        return int(row.get("Citing Author Papers Cited") or 0)
+    except ValueError:
+        return 0
+
+def count_authors(rows, author_citations=None):
+    """
+    Per-author maximum (citation count, papers cited); max() merges shards in
+    any order.
+    """
+    author_citations = {} if author_citations is None else author_citations
+    for row in rows:
+        unique_key = author_key(row)
+        # Store the citation count (assuming consistent across rows for same author)
+        if unique_key:
+            rank = (author_count(row), papers_cited(row))
+            author_citations[unique_key] = max(author_citations.get(unique_key, (0, 0)), rank)
+    return author_citations
+
+def _count_range(job):
+    path, header, start, end = job
+    return count_authors(read_csv_range(path, header, start, end))
+
+def _filter_range(job):
+    path, header, start, end, top_keys = job
+    return [row for row in read_csv_range(path, header, start, end) if author_key(row) in top_keys]
+
+def main(workers=1):
     input_file = config.OUTPUT_DIR / "citations_analysis.csv"
     output_file = config.OUTPUT_DIR / "high_impact_citing_authors.csv"
-    top_n = 30
+    top_n = TOP_N
     
     print(f"Reading from {input_file}...")
     
-    all_rows = []
-    author_citations = {} # Map unique identifier (Profile URL + Name) -> citation count
+    author_citations = {} # Map unique identifier (Profile URL + Name) -> (citation count, papers cited)
     
-    try:
-        with open(input_file, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            headers = reader.fieldnames
-            
-            for row in reader:
-                all_rows.append(row)
-                
-                # Identify author uniquely
-                profile = row.get("Citing Author Profile", "")
-                name = row.get("Citing Author Name", "")
-                unique_key = profile if profile else name
-                
-                try:
-                    count_str = row.get("Citing Author Total Citations", "0")
-                    if not count_str: count_str = "0"
-                    count = int(count_str)
-                except ValueError:
-                    count = 0
-                
-                # Store the citation count (assuming consistent across rows for same author)
-                if unique_key:
-                    author_citations[unique_key] = max(author_citations.get(unique_key, 0), count)
-                    
-    except FileNotFoundError:
+    workers = resolve_workers(workers)
+    if not input_file.exists():
         print(f"Error: {input_file} not found. Please run analyze_results.py first.")
         return
 
-    # Sort authors by citation count descending
-    sorted_authors = sorted(author_citations.items(), key=lambda x: x[1], reverse=True)
+    with (process_pool(workers) if workers > 1 else nullcontext()) as pool:
+        if pool:
+            # Shards are byte ranges of the CSV, cut on record boundaries
+            headers, ranges = csv_byte_ranges(input_file, workers * 4)
+            print(f"Filtering with {workers} worker processes ({len(ranges)} shards)...")
+            for shard in pool.map(_count_range, [(input_file, headers, start, end) for start, end in ranges]):
+                for key, rank in shard.items():
+                    author_citations[key] = max(author_citations.get(key, (0, 0)), rank)
+        else:
+            # First pass only aggregates per author; rows are streamed again below
+            # rather than held in memory
+            with open(input_file, "r", encoding="utf-8") as f:
+                reader = csv.DictReader(f)
+                headers = reader.fieldnames
+                count_authors(reader, author_citations)
+
+        # Sort authors by citation count descending, then by how many of our papers they cite
+        sorted_authors = sorted(author_citations.items(), key=lambda x: x[1], reverse=True)
     
-    # Take top N
-    top_authors = sorted_authors[:top_n]
-    top_keys = set(k for k, v in top_authors)
+        # Take top N
+        top_authors = sorted_authors[:top_n]
+        top_keys = set(k for k, v in top_authors)
     
-    if not top_authors:
-        print("No authors found.")
-        return
+        if not top_authors:
+            print("No authors found.")
+            return
 
-    print(f"Found {len(author_citations)} unique authors.")
-    print(f"Selected top {len(top_keys)} authors.")
-    print(f"  Highest citation count: {top_authors[0][1]}")
-    print(f"  Lowest citation count in top {top_n}: {top_authors[-1][1]}")
+        print(f"Found {len(author_citations)} unique authors.")
+        print(f"Selected top {len(top_keys)} authors.")
+        print(f"  Highest citation count: {top_authors[0][1][0]}")
+        print(f"  Lowest citation count in top {top_n}: {top_authors[-1][1][0]}")
     
-    # Filter rows that belong to these authors
-    filtered_rows = []
-    for row in all_rows:
-        profile = row.get("Citing Author Profile", "")
-        name = row.get("Citing Author Name", "")
-        key = profile if profile else name
-        
-        if key in top_keys:
-            filtered_rows.append(row)
+        # Filter rows that belong to these authors; shards come back in file order
+        if pool:
+            jobs = [(input_file, headers, start, end, top_keys) for start, end in ranges]
+            filtered_rows = [row for shard in pool.map(_filter_range, jobs) for row in shard]
+        else:
+            filtered_rows = [row for row in read_rows(input_file) if author_key(row) in top_keys]
             
-    # Sort the output rows by citation count descending for readability
-    filtered_rows.sort(key=lambda x: int(x.get("Citing Author Total Citations", 0) or 0), reverse=True)
+        # Sort the output rows by citation count descending for readability
+        filtered_rows.sort(key=lambda x: int(x.get("Citing Author Total Citations", 0) or 0), reverse=True)
 
-    if filtered_rows:
-        with open(output_file, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=headers)
-            writer.writeheader()
-            writer.writerows(filtered_rows)
-        print(f"Saved {len(filtered_rows)} rows associated with the top {len(top_keys)} authors to {output_file}")
-    else:
-        print("No matches found.")
+        if filtered_rows:
+            write_rows(filtered_rows, output_file, headers)
+            print(f"Saved {len(filtered_rows)} rows associated with the top {len(top_keys)} authors to {output_file}")
+        else:
+            print("No matches found.")
 
 if __name__ == "__main__":
     main()
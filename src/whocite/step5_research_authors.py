@@ -1,11 +1,29 @@
 import csv
+import gzip
 import json
-import re
-import time
-import os
-
+import math
+from datetime import date
 
 from .config import config
+from .export import write_rows
+from .research_backends import get_backend
+from .retry_queue import clear_failure, record_failure
+from .token_budget import BudgetExceeded, TokenBudget
+
+# Expected information gain of researching an author (see research_priority)
+MISSING_AFFILIATION_GAIN = 1.0
+KNOWN_AFFILIATION_GAIN = 0.3
+NEW_AUTHOR_GAIN = 1.0
+STALE_RESEARCH_GAIN = 0.5
+RANK_GAIN = 1.0
+# Successful research younger than this is reused instead of asked again
+DEFAULT_MAX_AGE_DAYS = 180
+
+def citation_count(author):
+    try:
+        return int(float(author.get("citations") or 0))
+    except ValueError:
+        return 0
 
 def load_unique_authors(filename, limit=None):
     """
@@ -32,6 +50,7 @@ def load_unique_authors(filename, limit=None):
                         "original_affiliation": row.get("Citing Author Affiliation", ""),
                         "citations": row.get("Citing Author Total Citations", "0"),
                         "h_index": row.get("Citing Author h-index", "0"),
+                        "papers_cited": row.get("Citing Author Papers Cited", ""),
                         "sample_citing_paper": row.get("Citing Paper Title", "")
                     }
     except FileNotFoundError:
@@ -41,27 +60,64 @@ def load_unique_authors(filename, limit=None):
     authors_list = list(unique_authors.values())
     
     # Sort by citations desc just in case
-    authors_list.sort(key=lambda x: int(x["citations"]) if x["citations"].isdigit() else 0, reverse=True)
+    authors_list.sort(key=citation_count, reverse=True)
     
     if limit:
         return authors_list[:limit]
     return authors_list
 
-def extract_tag(text, tag):
-    """Extracts content between [TAG] and [/TAG]"""
-    pattern = f"\\[{tag}\\](.*?)\\[/{tag}\\]"
-    match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-    if match:
-        return match.group(1).strip()
-    return ""
+RESEARCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "description": "Full name"},
+        "affiliation": {"type": "string", "description": "Current institution"},
+        "title": {"type": "string", "description": "Academic title"},
+        "link": {"type": "string", "description": "URL of faculty, lab or Google Scholar page"},
+    },
+    "required": ["name", "affiliation", "title", "link"],
+    "additionalProperties": False,
+}
+
+def parse_research_response(text):
+    """
+    Validates a JSON research answer against RESEARCH_SCHEMA.
+    Returns (result, None) on success or (None, reason) when the output is unusable.
+    """
+    text = text.strip()
+    if not text:
+        return None, "empty response"
+    try:
+        data = json.loads(text)
+    except ValueError:
+        # Backends without native structured output sometimes wrap the JSON in prose or fences
+        start, end = text.find("{"), text.rfind("}")
+        if start == -1 or end < start:
+            return None, "no JSON object in response"
+        try:
+            data = json.loads(text[start:end + 1])
+        except ValueError:
+            return None, "malformed JSON"
+    if not isinstance(data, dict):
+        return None, "JSON is not an object"
+
+    fields = RESEARCH_SCHEMA["required"]
+    missing = [f for f in fields if not isinstance(data.get(f), str)]
+    if missing:
+        return None, f"missing fields: {', '.join(missing)}"
+    result = {f: data[f].strip() for f in fields}
+    if not result["name"]:
+        return None, "empty name"
+    if result["link"] and not result["link"].startswith(("http://", "https://")):
+        result["link"] = ""
+    return result, None
 
-def research_author_google(client, model, author_data):
+def build_research_prompt(author_data):
     name = author_data["name"]
     affiliation = author_data["original_affiliation"]
     sample_paper = author_data["sample_citing_paper"]
     profile_link = author_data["profile"]
     
-    prompt = f"""
+    return f"""
     Please research the following academic author:
     Name: {name}
     Profile Link: {profile_link}
@@ -75,137 +131,207 @@ def research_author_google(client, model, author_data):
     3. Academic Title (e.g., Professor, Associate Professor, Researcher, PhD Candidate)
     4. A direct link to their faculty page, lab page, or Google Scholar profile (if different from the input).
 
-    Output the result STRICTLY in the following format with tags:
-    [Name] Full Name [/Name]
-    [Affiliation] Current Institution Name [/Affiliation]
-    [Title] Academic Title [/Title]
-    [LINK] URL to profile [/LINK]
+    Output ONLY a JSON object with these string fields (use "" when unknown):
+    {{"name": "Full Name", "affiliation": "Current Institution Name", "title": "Academic Title", "link": "URL to profile"}}
     """
+
+def enrich_author(author, result, status):
+    result = result or {}
     
+    enriched_record = author.copy()
+    # Fallback to original if research failed or returned empty
+    enriched_record["Researched Name"] = result.get("name") or author["name"]
+    enriched_record["Researched Affiliation"] = result.get("affiliation") or author["original_affiliation"]
+    enriched_record["Researched Title"] = result.get("title", "")
+    enriched_record["Researched Link"] = result.get("link", "")
+    enriched_record["Research Status"] = status
+    enriched_record["Researched At"] = date.today().isoformat() if status == "ok" else ""
+    return enriched_record
+
+def research_age_days(row):
+    """Days since a previous result was researched; None for rows written before dates were kept."""
     try:
-        from google import genai
-        from google.genai import types
-        
-        grounding_tool = types.Tool(
-            google_search=types.GoogleSearch()
-        )
-
-        config = types.GenerateContentConfig(
-            tools=[grounding_tool],
-            temperature=1.0
-        )
-        
-        print(f"  Searching for {name} using Google GenAI...")
-        
-        response = client.models.generate_content(
-            model=model,
-            contents=prompt,
-            config=config,
-        )
-        
-        # Extract text from candidates
-        if response.candidates and response.candidates[0].content and response.candidates[0].content.parts:
-            parts = response.candidates[0].content.parts
-            text_parts = [p.text for p in parts if p.text]
-            return "".join(text_parts)
-            
-        return ""
+        return (date.today() - date.fromisoformat(row.get("Researched At", ""))).days
+    except ValueError:
+        return None
 
-    except Exception as e:
-        print(f"  Error researching {name}: {e}")
-        return ""
+def research_priority(author, previous, max_citations):
+    """
+    Expected information gain of one research call for `author`: a missing
+    affiliation is worth more than confirming a known one, a first lookup
+    more than refreshing a stale one, and highly cited authors matter more
+    to the report. `previous` is the author's outdated result, if any.
+    """
+    gain = KNOWN_AFFILIATION_GAIN if author["original_affiliation"] else MISSING_AFFILIATION_GAIN
+    gain += STALE_RESEARCH_GAIN if previous else NEW_AUTHOR_GAIN
+    if max_citations:
+        gain += RANK_GAIN * math.log1p(citation_count(author)) / math.log1p(max_citations)
+    return gain
+
+def load_researched(filename):
+    """Rows of a previous enriched CSV whose research succeeded, keyed like load_unique_authors."""
+    filepath = config.OUTPUT_DIR / filename
+    researched = {}
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                key = row.get("profile") or row.get("name")
+                if key and row.get("Research Status") == "ok":
+                    researched[key] = row
+    except FileNotFoundError:
+        pass
+    return researched
 
-def main(limit=None):
+def main(limit=None, backend="gemini", batch=False, max_input_tokens=None, max_cost=None, max_retries=1,
+         only_new=False, max_age_days=DEFAULT_MAX_AGE_DAYS, trust_affiliations=False):
     input_file = config.OUTPUT_DIR / "high_impact_citing_authors.csv"
     output_file = config.OUTPUT_DIR / "high_impact_authors_enriched.csv"
+    raw_file = config.OUTPUT_DIR / "research_raw_responses.jsonl.gz"
 
-    authors = load_unique_authors(input_file, limit)
-    print(f"Loaded {len(authors)} authors to research.")
+    authors = load_unique_authors(input_file)
+    print(f"Loaded {len(authors)} authors.")
+    
+    # Slots keep the output in ranking order even though answers arrive out of order
+    enriched_data = [None] * len(authors)
+    researched = load_researched(output_file)
+    max_citations = max((citation_count(a) for a in authors), default=0)
+    candidates = []
+    reused = known = 0
+    for i, author in enumerate(authors):
+        previous = researched.get(author["profile"] or author["name"])
+        age = research_age_days(previous) if previous else None
+        if previous and (only_new or (age is not None and age <= max_age_days)):
+            enriched_data[i] = previous
+            reused += 1
+        elif trust_affiliations and author["original_affiliation"]:
+            enriched_data[i] = enrich_author(author, None, "skipped: known affiliation")
+            known += 1
+        else:
+            candidates.append((research_priority(author, previous, max_citations), i))
+    
+    # Highest expected gain first: --limit and the token budget cut the least valuable calls
+    candidates.sort(key=lambda c: (-c[0], c[1]))
+    pending = [i for _, i in candidates]
+    if limit and len(pending) > limit:
+        print(f"  Limiting research to the {limit} most valuable of {len(pending)} authors.")
+        pending = pending[:limit]
+    print(f"  {reused} reused from earlier research, {known} skipped with a known affiliation, "
+          f"{len(pending)} to research.")
+    if not pending:
+        save_csv([r for r in enriched_data if r], output_file)
+        return
     
-    # Initialize Google Client
     try:
-        from google import genai
-        
-        # Use centralized config
-        gemini_cfg = config.llm.get("gemini")
-        if not gemini_cfg:
-             # Fallback check or default?
-             # If config.llm is typed dict, access might fail if key missing?
-             # Use .get on the underlying dict if needed, or try block.
-             # config.llm returns Dict[str, LLMSettings]
-             if "gemini" in config.llm:
-                 gemini_cfg = config.llm["gemini"]
-             else:
-                 print("Warning: [llm.gemini] not found in config.")
-                 gemini_cfg = None
-
-        api_key = os.environ.get("GOOGLE_API_KEY")
-        model = "gemini-2.0-flash-exp"
-        
-        if gemini_cfg:
-            if gemini_cfg.api_key:
-                api_key = gemini_cfg.api_key
-            if gemini_cfg.model:
-                model = gemini_cfg.model
-
-        if not api_key:
-             print("Warning: GOOGLE_API_KEY not found in env or config/config.toml. Client init might fail.")
-             
-        client = genai.Client(api_key=api_key)
-        print(f"Initialized Google GenAI Client with model: {model}")
-        
-    except ImportError:
-        print("Error: google-genai package not installed.")
+        research_backend = get_backend(backend)
+    except ImportError as e:
+        print(f"Error: SDK for the {backend} backend is not installed ({e}).")
         return
     except Exception as e:
-        print(f"Failed to initialize Google client: {e}")
+        print(f"Failed to initialize {backend} backend: {e}")
         return
+    print(f"Initialized {research_backend.name} backend with model: {research_backend.model} "
+          f"(up to {research_backend.max_concurrency} concurrent requests)")
 
-    enriched_data = []
+    # Prompts are sent in priority order, so the budget goes to the most valuable authors first
+    budget = TokenBudget.from_settings(research_backend.settings, max_input_tokens, max_cost)
+    if max_cost is not None and not budget.has_pricing:
+        # Without prices every request looks free, so the limit would never apply
+        print(f"Error: --max-cost needs input_cost_per_million / output_cost_per_million "
+              f"in the [llm.{backend}] section of config.toml.")
+        return
+    use_batch = batch and research_backend.supports_batch
+    if batch and not use_batch:
+        print(f"Warning: {research_backend.name} backend has no batch API. Sending requests individually.")
+
+    skipped = 0
+    wasted = 0
+    out_of_budget = []  # invalid authors whose re-ask no longer fit the budget
+    queued = set()
     
-    for i, author in enumerate(authors):
-        print(f"[{i+1}/{len(authors)}] Researching {author['name']}...")
-        
-        raw_response = research_author_google(client, model, author)
-        
-        # Parse tags
-        extracted_name = extract_tag(raw_response, "Name")
-        extracted_aff = extract_tag(raw_response, "Affiliation")
-        extracted_title = extract_tag(raw_response, "Title")
-        extracted_link = extract_tag(raw_response, "LINK")
-        
-        # Fallback to original if extraction fails or returns empty
-        final_name = extracted_name if extracted_name else author["name"]
-        final_aff = extracted_aff if extracted_aff else author["original_affiliation"]
-        
-        enriched_record = author.copy()
-        enriched_record["Researched Name"] = final_name
-        enriched_record["Researched Affiliation"] = final_aff
-        enriched_record["Researched Title"] = extracted_title
-        enriched_record["Researched Link"] = extracted_link
-        enriched_record["Raw LLM Response"] = raw_response
-        
-        enriched_data.append(enriched_record)
-        
-        # Intermediate save
-        if i % 5 == 0:
-             save_csv(enriched_data, output_file)
-             
-        # Be polite to rate limits
-        time.sleep(2) # Slightly longer sleep for GenAI just in case
+    # Raw responses go to a compressed side file instead of bloating the CSV
+    with gzip.open(raw_file, "at" if reused else "wt", encoding="utf-8") as raw_out:
+        for attempt in range(max_retries + 1):
+            if attempt:
+                print(f"Retrying {len(pending)} authors whose output failed validation (attempt {attempt + 1})...")
+            prompts = [build_research_prompt(authors[i]) for i in pending]
+            if use_batch:
+                print(f"Submitting {len(prompts)} authors through the {research_backend.name} batch API...")
+                outcomes = research_backend.research_batch(prompts, budget, RESEARCH_SCHEMA)
+            else:
+                outcomes = research_backend.research_many(prompts, budget, RESEARCH_SCHEMA)
+            
+            invalid = []
+            for done, (j, response, error) in enumerate(outcomes, start=1):
+                i = pending[j]
+                author = authors[i]
+                if isinstance(error, BudgetExceeded):
+                    if attempt:
+                        out_of_budget.append(i)
+                    else:
+                        skipped += 1
+                    continue
+                print(f"[{done}/{len(prompts)}] Researched {author['name']}")
+                key = author["profile"] or author["name"]
+                if error is not None:
+                    print(f"  Error researching {author['name']}: {error}")
+                    enriched_data[i] = enrich_author(author, None, "error")
+                    record_failure("research", key, error, {"author": author, "backend": backend})
+                    queued.add(key)
+                else:
+                    raw_out.write(json.dumps({
+                        "key": key,
+                        "attempt": attempt + 1,
+                        "response": response.text,
+                    }) + "\n")
+                    result, problem = parse_research_response(response.text)
+                    if result is None:
+                        print(f"  Invalid output for {author['name']}: {problem}")
+                        wasted += 1
+                        invalid.append(i)
+                    else:
+                        clear_failure("research", key)
+                    enriched_data[i] = enrich_author(author, result, "ok" if result else f"invalid: {problem}")
+                enriched_data[i]["Input Tokens"] = response.input_tokens if response else ""
+                enriched_data[i]["Output Tokens"] = response.output_tokens if response else ""
+                
+                # Intermediate save
+                if done % 5 == 0:
+                     save_csv([r for r in enriched_data if r], output_file)
+            
+            # Only authors whose answer failed validation are asked again, still by priority
+            invalid = set(invalid)
+            pending = [i for i in pending if i in invalid]
+            if not pending:
+                break
+
+    # Authors still without valid output after the last attempt, or whose re-ask
+    # ran out of budget, wait for `whocite retry`
+    unresolved = pending + out_of_budget
+    for i in unresolved:
+        author = authors[i]
+        key = author["profile"] or author["name"]
+        error = ValueError(enriched_data[i]["Research Status"])
+        record_failure("research", key, error, {"author": author, "backend": backend})
+        queued.add(key)
 
     # Final save
-    save_csv(enriched_data, output_file)
-    print(f"Completed research. Saved to {output_file}")
+    save_csv([r for r in enriched_data if r], output_file)
+    print(f"LLM usage: {budget.summary()}")
+    if wasted:
+        print(f"{wasted} responses failed validation; {len(unresolved)} authors still lack valid research.")
+    if queued:
+        print(f"{len(queued)} authors are queued for `whocite retry`.")
+    if skipped:
+        print(f"Budget exhausted: skipped {skipped} lower-ranked authors.")
+    print(f"Completed research. Saved to {output_file} (raw responses in {raw_file.name})")
+    # Usage of this run, which `run-all --sample` extrapolates to the full bibliography
+    return budget
 
 def save_csv(data, filename):
     if not data: return
-    keys = list(data[0].keys())
-    filepath = config.OUTPUT_DIR / filename
-    with open(filepath, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=keys)
-        writer.writeheader()
-        writer.writerows(data)
+    # Reused rows from older runs may lack newer columns, so take the union in first-seen order
+    fieldnames = list(dict.fromkeys(key for row in data for key in row))
+    write_rows(data, config.OUTPUT_DIR / filename, fieldnames)
 
 if __name__ == "__main__":
     main()
@@ -3,6 +3,7 @@ import shutil
 import os
 
 from .config import config
+from .export import write_rows
 
 def load_enriched_data(filename):
     """
@@ -46,8 +47,27 @@ def main():
     target_path = config.OUTPUT_DIR / target_file
     output_path = config.OUTPUT_DIR / output_file
     
-    merged_rows = []
-    fieldnames = []
+    def merge_rows(reader):
+        for row in reader:
+            profile = row.get("Citing Author Profile", "")
+            name = row.get("Citing Author Name", "")
+            key = profile if profile else name
+            
+            if key and key in enriched_map:
+                source_row = enriched_map[key]
+                # Map source columns to target columns
+                row["Researched Name"] = source_row.get("Researched Name", "")
+                row["Researched Affiliation"] = source_row.get("Researched Affiliation", "")
+                row["Researched Title"] = source_row.get("Researched Title", "")
+                row["Researched Link"] = source_row.get("Researched Link", "")
+            else:
+                # Fill empty if no match
+                row["Researched Name"] = ""
+                row["Researched Affiliation"] = ""
+                row["Researched Title"] = ""
+                row["Researched Link"] = ""
+            
+            yield row
     
     try:
         with open(target_path, "r", encoding="utf-8") as f:
@@ -60,36 +80,12 @@ def main():
                 if col not in fieldnames:
                     fieldnames.append(col)
             
-            for row in reader:
-                profile = row.get("Citing Author Profile", "")
-                name = row.get("Citing Author Name", "")
-                key = profile if profile else name
-                
-                if key and key in enriched_map:
-                    source_row = enriched_map[key]
-                    # Map source columns to target columns
-                    row["Researched Name"] = source_row.get("Researched Name", "")
-                    row["Researched Affiliation"] = source_row.get("Researched Affiliation", "")
-                    row["Researched Title"] = source_row.get("Researched Title", "")
-                    row["Researched Link"] = source_row.get("Researched Link", "")
-                else:
-                    # Fill empty if no match
-                    row["Researched Name"] = ""
-                    row["Researched Affiliation"] = ""
-                    row["Researched Title"] = ""
-                    row["Researched Link"] = ""
-                
-                merged_rows.append(row)
+            # Stream merged rows to the new file while reading the target
+            write_rows(merge_rows(reader), output_path, fieldnames)
                 
     except FileNotFoundError:
         print(f"Error: {target_file} not found.")
         return
-
-    # Write to new file
-    with open(output_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(merged_rows)
         
     print(f"Merged data saved to {output_file}")
     
@@ -0,0 +1,118 @@
+import threading
+from typing import Optional
+
+
+class BudgetExceeded(Exception):
+    """Raised for work that was not started because the budget ran out."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt size: ~4 characters per token for English text."""
+    return len(text) // 4 + 1
+
+
+class TokenBudget:
+    """
+    Thread-safe accounting of LLM usage for one research run.
+
+    Before a request is sent, its estimated prompt size is reserved; once the
+    response arrives the reservation is replaced by the usage the provider
+    reported. Requests that would push input tokens or cost past the limits
+    are refused, so callers submitting work in ranking order spend the budget
+    on the highest-ranked authors first.
+
+    The cost check also counts the output every request in flight is still
+    expected to produce: the mean output so far, or `expected_output_tokens`
+    before the first response arrives.
+    """
+
+    def __init__(
+        self,
+        max_input_tokens: Optional[int] = None,
+        max_cost: Optional[float] = None,
+        input_cost_per_million: Optional[float] = None,
+        output_cost_per_million: Optional[float] = None,
+        expected_output_tokens: Optional[int] = None,
+    ):
+        self.max_input_tokens = max_input_tokens
+        self.max_cost = max_cost
+        self.input_cost_per_million = input_cost_per_million or 0.0
+        self.output_cost_per_million = output_cost_per_million or 0.0
+        self.expected_output_tokens = expected_output_tokens or 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.requests = 0
+        self._reserved = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings, max_input_tokens=None, max_cost=None):
+        """Builds a budget from an LLMSettings section; explicit limits win."""
+        if settings is None:
+            return cls(max_input_tokens=max_input_tokens, max_cost=max_cost)
+        return cls(
+            max_input_tokens=max_input_tokens or settings.max_input_tokens,
+            max_cost=max_cost,
+            input_cost_per_million=settings.input_cost_per_million,
+            output_cost_per_million=settings.output_cost_per_million,
+            expected_output_tokens=settings.max_completion_tokens,
+        )
+
+    @property
+    def has_pricing(self) -> bool:
+        return bool(self.input_cost_per_million or self.output_cost_per_million)
+
+    def _cost(self, input_tokens: int, output_tokens: int) -> float:
+        return (
+            input_tokens * self.input_cost_per_million
+            + output_tokens * self.output_cost_per_million
+        ) / 1_000_000
+
+    @property
+    def cost(self) -> float:
+        return self._cost(self.input_tokens, self.output_tokens)
+
+    def _output_estimate(self) -> float:
+        if self.requests:
+            return self.output_tokens / self.requests
+        return self.expected_output_tokens
+
+    def try_reserve(self, estimate: int) -> bool:
+        """Reserves `estimate` input tokens if the request still fits the budget."""
+        with self._lock:
+            committed = self.input_tokens + self._reserved + estimate
+            if self.max_input_tokens is not None and committed > self.max_input_tokens:
+                return False
+            if self.max_cost is not None and self.has_pricing:
+                expected_output = self.output_tokens + (self._in_flight + 1) * self._output_estimate()
+                if self._cost(committed, expected_output) > self.max_cost:
+                    return False
+            self._reserved += estimate
+            self._in_flight += 1
+            return True
+
+    def record(self, estimate: int, input_tokens: Optional[int], output_tokens: Optional[int]):
+        """Replaces a reservation with the usage reported by the provider."""
+        with self._lock:
+            self._reserved -= estimate
+            self._in_flight -= 1
+            self.input_tokens += input_tokens if input_tokens is not None else estimate
+            self.output_tokens += output_tokens or 0
+            self.requests += 1
+
+    def release(self, estimate: int):
+        """Drops a reservation for a request that failed before billing."""
+        with self._lock:
+            self._reserved -= estimate
+            self._in_flight -= 1
+
+    def summary(self) -> str:
+        text = f"{self.requests} requests, {self.input_tokens} input / {self.output_tokens} output tokens"
+        if self.max_input_tokens is not None:
+            text += f" (input budget {self.max_input_tokens})"
+        if self.has_pricing:
+            text += f", cost ${self.cost:.4f}"
+            if self.max_cost is not None:
+                text += f" of ${self.max_cost:.2f}"
+        return text
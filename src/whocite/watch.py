@@ -0,0 +1,184 @@
+import json
+import time
+
+from .artifacts import CITATIONS_FILE, iter_citations, save_citations
+from .config import config
+from .ingest import file_sha256, paper_key, plan_citation_fetches, resolve_missing_dois
+from .retry_queue import load_queue
+from . import step1_fetch_citations as step1
+from . import step2_fetch_author_details as step2
+from . import step3_analyze_results as step3
+from . import step4_filter_authors as step4
+from . import step5_research_authors as step5
+from . import step6_merge_results as step6
+
+STATE_FILE = "watch_state.json"
+# Weight of the newest observation in the citations-per-day moving average
+GROWTH_SMOOTHING = 0.5
+
+
+def load_state():
+    try:
+        with open(config.OUTPUT_DIR / STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"papers": {}}
+
+
+def save_state(state):
+    with open(config.OUTPUT_DIR / STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+
+def update_growth(previous, count, now):
+    """Returns the paper's state after observing `count` citations at `now`."""
+    if previous is None:
+        return {"citation_count": count, "checked_at": now, "rate": 0.0}
+    # Floor at one hour so back-to-back cycles do not inflate the rate
+    days = max((now - previous["checked_at"]) / 86400, 1 / 24)
+    observed = (count - previous["citation_count"]) / days
+    rate = GROWTH_SMOOTHING * observed + (1 - GROWTH_SMOOTHING) * previous["rate"]
+    return {"citation_count": count, "checked_at": now, "rate": rate}
+
+
+def refresh_citations(api_key, state, max_papers=None):
+    """
+    Brings the citation data up to date with my.bib and Semantic Scholar.
+
+    One /paper/batch preflight returns the current citation count of every
+    paper. Only papers that are new, whose count moved or whose last fetch
+    left a page in the retry queue are paged through again, fastest-growing
+    first. Without a watch state, the counts step 1 stored with the citation
+    data stand in for it. With `max_papers` the rest wait for the next
+    cycle. Papers removed from the bib are dropped. Returns True when
+    the citation data changed.
+    """
+    papers = step1.load_papers_from_bib()
+    resolve_missing_dois(papers, api_key)
+    plan, _ = plan_citation_fetches(papers, api_key)
+    now = time.time()
+
+    try:
+        by_key = {paper_key(entry["my_paper"]): entry for entry in iter_citations()}
+    except FileNotFoundError:
+        by_key = {}
+    queued = load_queue()
+
+    known = state["papers"]
+    changed = []
+    unchanged = {}
+    for item in plan:
+        paper = item["paper"]
+        key = paper_key(paper)
+        count = item["citation_count"]
+        previous = known.get(key)
+        if previous is None and key in by_key and by_key[key].get("citation_count") is not None:
+            # No watch state yet (first cycle after `run-all`): step 1 stored the count it fetched at
+            previous = update_growth(None, by_key[key]["citation_count"], now)
+        # A paper with a queued failed page is incomplete whatever its count says
+        failed = f"citations:{step1.failure_key(paper.get('doi'), paper.get('s2_paper_id'))}" in queued
+        if previous is not None and count is not None and count == previous["citation_count"] and not failed:
+            known[key] = update_growth(previous, count, now)
+            unchanged[key] = count
+        else:
+            changed.append((key, item, previous))
+
+    # New papers first, then by how fast their citations have been growing
+    changed.sort(key=lambda c: (c[2] is None, c[2]["rate"] if c[2] else 0.0), reverse=True)
+    if max_papers is not None and len(changed) > max_papers:
+        print(f"Deferring {len(changed) - max_papers} slower-growing papers to the next cycle.")
+        changed = changed[:max_papers]
+
+    # Entries written before citation_count was stored get it back, so a
+    # `run-all` after `--sample` can reuse them
+    for key, count in unchanged.items():
+        if key in by_key:
+            by_key[key].setdefault("citation_count", count)
+
+    bib_keys = {paper_key(paper) for paper in papers}
+    removed = [key for key in by_key if key not in bib_keys]
+    for key in removed:
+        del by_key[key]
+        known.pop(key, None)
+
+    for key, item, previous in changed:
+        paper = item["paper"]
+        print(f"Refreshing citations for {paper.get('title', 'Unknown Title')}")
+        citations = step1.fetch_citations(paper.get("doi"), api_key, paper_id=paper.get("s2_paper_id"))
+        by_key[key] = {"my_paper": paper, "citation_count": item["citation_count"], "citations": citations}
+        failure = f"citations:{step1.failure_key(paper.get('doi'), paper.get('s2_paper_id'))}"
+        if failure in load_queue():
+            # Partial fetch: leave the state alone so the next cycle fetches the paper again
+            print("  Fetch incomplete; the paper stays due for the next cycle.")
+        elif item["citation_count"] is not None:
+            known[key] = update_growth(previous, item["citation_count"], now)
+        time.sleep(1.1)
+
+    if not changed and not removed:
+        print("No new citations.")
+        return False
+
+    save_citations(by_key.values())
+    print(f"Updated {len(changed)} papers, removed {len(removed)} from {CITATIONS_FILE}")
+    return True
+
+
+def run_cycle(api_key, state, research=False, backend="gemini", max_papers=None):
+    """One watch cycle: refresh citations, then rerun only the steps downstream of a change."""
+    if not refresh_citations(api_key, state, max_papers):
+        save_state(state)
+        return False
+
+    step2.main(only_missing=True)
+    step3.main()
+    step4.main()
+    if research:
+        step5.main(backend=backend, only_new=True)
+    if (config.OUTPUT_DIR / "high_impact_authors_enriched.csv").exists():
+        # Step 4 rewrote the high-impact list, so researched columns must be merged back in
+        step6.main()
+    save_state(state)
+    return True
+
+
+def watch(interval=60, bib_poll=30, research=False, backend="gemini", max_papers=None, once=False):
+    """
+    Runs refresh cycles until interrupted.
+
+    A cycle runs every `interval` minutes, and immediately whenever my.bib
+    changes (checked every `bib_poll` seconds). The process stays alive
+    between cycles, so imported modules and the pooled HTTP session stay warm.
+    """
+    api_key = step1.load_api_key()
+    bib_path = config.PROJECT_ROOT / "my.bib"
+    state = load_state()
+    bib_sha = None
+    last_cycle = 0.0
+
+    print(f"Watching {bib_path}; polling Semantic Scholar every {interval} minutes. Ctrl+C to stop.")
+    try:
+        while True:
+            try:
+                sha = file_sha256(bib_path)
+            except FileNotFoundError:
+                print(f"Error: {bib_path} not found.")
+                sha = bib_sha
+
+            bib_changed = sha is not None and sha != bib_sha
+            due = time.time() - last_cycle >= interval * 60
+            if bib_changed or due:
+                reason = "my.bib changed" if bib_changed and bib_sha is not None else "scheduled poll"
+                print(f"\n[{time.strftime('%Y-%m-%d %H:%M:%S')}] Cycle start ({reason})")
+                try:
+                    run_cycle(api_key, state, research, backend, max_papers)
+                except Exception as e:
+                    # A failed cycle must not take the daemon down; the next one retries
+                    print(f"Cycle failed: {e}")
+                bib_sha = sha
+                last_cycle = time.time()
+
+            if once:
+                break
+            time.sleep(bib_poll)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
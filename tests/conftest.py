@@ -0,0 +1,10 @@
+import pytest
+
+from whocite.config import _LazyConfig
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    """Points config.OUTPUT_DIR at a fresh temporary directory."""
+    monkeypatch.setitem(_LazyConfig._paths, "OUTPUT_DIR", lambda: tmp_path)
+    return tmp_path
@@ -0,0 +1,16 @@
+import pytest
+from click.testing import CliRunner
+
+from whocite.cli import cli
+
+
+@pytest.mark.parametrize("command", ["analyze", "filter", "run-all"])
+def test_negative_workers_are_rejected(command):
+    result = CliRunner().invoke(cli, [command, "--workers", "-2"])
+    assert result.exit_code == 2
+    assert "Invalid value for '--workers'" in result.output
+
+
+def test_export_needs_at_least_one_worker():
+    result = CliRunner().invoke(cli, ["export", "--workers", "0"])
+    assert result.exit_code == 2
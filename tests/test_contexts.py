@@ -0,0 +1,34 @@
+from whocite.contexts import collect, citation_sentence
+
+
+def test_author_year_citation_keeps_whole_sentence():
+    context = "Smith et al. (2020) proposed a robust and efficient method for X. We build on it."
+    assert citation_sentence(context) == "Smith et al. (2020) proposed a robust and efficient method for X."
+
+
+def test_numeric_citation_sentence_is_picked_out():
+    context = "Prior work is slow. Deep nets [12] work well, e.g. Fig. 3 shows this. We differ."
+    assert citation_sentence(context) == "Deep nets [12] work well, e.g. Fig. 3 shows this."
+
+
+def test_context_without_marker_is_kept_whole():
+    assert citation_sentence("A plain  excerpt. With two sentences.") == "A plain excerpt. With two sentences."
+
+
+def test_author_year_sentences_stay_distinct():
+    contexts = [
+        "Smith et al. (2020) proposed a robust and efficient method for X. We build on it.",
+        "Jones et al. (2019) fail to handle long inputs. We address this.",
+        "Lee et al. (2021) introduced a novel dataset. It is large.",
+    ]
+    data = [{
+        "my_paper": {"title": "Mine"},
+        "citations": [
+            {"citingPaper": {"title": f"P{i}", "authors": []}, "contexts": [context]}
+            for i, context in enumerate(contexts)
+        ],
+    }]
+    table, edges, _ = collect(data)
+    assert len(table.sentences) == 3
+    assert table.scores[0] > 0 and table.scores[1] < 0
+    assert "robust" not in table.keywords([1], 5)
@@ -0,0 +1,26 @@
+from whocite import step2_fetch_author_details as step2
+from whocite.artifacts import load_authors, save_authors, save_citations
+from whocite.retry_queue import load_queue, record_failure
+
+
+def citation(*author_ids):
+    return {"citingPaper": {"title": "T", "authors": [{"authorId": a, "name": a} for a in author_ids]}}
+
+
+def test_only_missing_clears_batches_it_fetched(output_dir, monkeypatch):
+    save_citations([{"my_paper": {"doi": "10.1/x"}, "citations": [citation("a1", "a2"), citation("a3")]}])
+    save_authors({"a1": {"authorId": "a1", "name": "a1"}})
+    record_failure("authors", "a2+1", ValueError("timeout"), {"ids": ["a2"]})
+    record_failure("authors", "a9+1", ValueError("timeout"), {"ids": ["a9"]})
+    record_failure("research", "someone", ValueError("timeout"), {"author": {}})
+
+    fetched = []
+    monkeypatch.setattr(step2, "fetch_author_batch",
+                        lambda ids, api_key=None: fetched.extend(ids) or [{"authorId": a, "name": a} for a in ids])
+    monkeypatch.setattr(step2.time, "sleep", lambda seconds: None)
+    step2.main(only_missing=True)
+
+    assert fetched == ["a2", "a3"]
+    assert set(load_authors()) == {"a1", "a2", "a3"}
+    # a9 is not cited anywhere any more, so it is still unresolved
+    assert set(load_queue()) == {"authors:a9+1", "research:someone"}
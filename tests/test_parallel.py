@@ -0,0 +1,52 @@
+import csv
+import random
+
+import pytest
+
+from whocite import parallel
+from whocite.parallel import csv_byte_ranges, read_csv_range, split_weighted
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["text", "n"])
+        writer.writerows(rows)
+
+
+@pytest.mark.parametrize("chunk", [1, 5, 64, 1 << 20])
+def test_ranges_cut_only_at_record_boundaries(tmp_path, monkeypatch, chunk):
+    monkeypatch.setattr(parallel, "SCAN_CHUNK", chunk)
+    rnd = random.Random(chunk)
+    rows = [
+        [rnd.choice(["plain", 'a "quoted" word', "two\nlines", "comma, é", ""]) * rnd.randint(1, 4), str(i)]
+        for i in range(200)
+    ]
+    path = tmp_path / "rows.csv"
+    write_csv(path, rows)
+    with open(path, newline="", encoding="utf-8") as f:
+        expected = list(csv.DictReader(f))
+
+    for shards in (1, 2, 3, 7, 50, 500):
+        header, ranges = csv_byte_ranges(path, shards)
+        assert header == ["text", "n"]
+        assert len(ranges) <= shards
+        assert all(end > start for start, end in ranges)
+        parsed = [row for start, end in ranges for row in read_csv_range(path, header, start, end)]
+        assert parsed == expected
+
+
+def test_ranges_of_header_only_file(tmp_path):
+    path = tmp_path / "empty.csv"
+    write_csv(path, [])
+    header, ranges = csv_byte_ranges(path, 4)
+    assert header == ["text", "n"]
+    assert [row for start, end in ranges for row in read_csv_range(path, header, start, end)] == []
+
+
+def test_split_weighted_keeps_order_and_balances():
+    groups = split_weighted(list(range(10)), [10, 1, 1, 1, 1, 1, 1, 1, 1, 10], 3)
+    assert [item for group in groups for item in group] == list(range(10))
+    assert len(groups) <= 3
+    # The heavy first item fills a shard on its own
+    assert groups[0] == [0]
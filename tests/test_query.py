@@ -0,0 +1,70 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+from click.testing import CliRunner
+
+from whocite.cli import cli
+from whocite.export import write_rows
+from whocite.query import QueryHandler
+from whocite.step3_analyze_results import ANALYSIS_FIELDS
+
+
+def write_analysis(output_dir):
+    row = dict.fromkeys(ANALYSIS_FIELDS, "")
+    row.update({
+        "My Paper DOI": "10.1/mine", "My Paper Title": "My Paper", "Citing Paper Title": "Their Paper",
+        "Citing Paper Year": "2021", "Citing Paper Venue": "Venue", "Citing Author Name": "Ada Lovelace",
+        "Citing Author Affiliation": "Somewhere", "Citing Author Total Citations": "10",
+    })
+    write_rows([row], output_dir / "citations_analysis.csv", ANALYSIS_FIELDS)
+
+
+def test_query_filters_by_year(output_dir):
+    write_analysis(output_dir)
+    result = CliRunner().invoke(cli, ["query", "--year", "2020-2022", "--json"])
+    assert result.exit_code == 0, result.output
+    assert '"total": 1' in result.output
+
+
+def test_query_rejects_bad_year_without_traceback(output_dir):
+    write_analysis(output_dir)
+    result = CliRunner().invoke(cli, ["query", "--year", "abc"])
+    assert result.exit_code == 2
+    assert result.exception is None or isinstance(result.exception, SystemExit)
+    assert "Invalid value" in result.output
+
+
+def get_json(url):
+    try:
+        with urlopen(url) as response:
+            return response.status, json.load(response)
+    except HTTPError as e:
+        return e.code, json.load(e)
+
+
+@pytest.fixture
+def api(output_dir):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), QueryHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_api_reports_missing_analysis(api):
+    status, body = get_json(f"{api}/citations?author=ada")
+    assert status == 503
+    assert "whocite analyze" in body["error"]
+
+
+def test_api_serves_and_rejects_bad_filters(api, output_dir):
+    write_analysis(output_dir)
+    status, body = get_json(f"{api}/citations?year=2021")
+    assert status == 200 and body["total"] == 1
+    status, body = get_json(f"{api}/citations?year=abc")
+    assert status == 400
@@ -0,0 +1,149 @@
+import csv
+
+import pytest
+from click.testing import CliRunner
+
+from whocite import retry_queue
+from whocite.cli import cli
+from whocite.research_backends import BackendResponse, FakeBackend
+from whocite.retry_queue import load_queue
+from whocite.step5_research_authors import parse_research_response
+
+AUTHORS = [
+    ("Ada Lovelace", "5000", "Analytical Engines Ltd"),
+    ("Alan Turing", "4000", ""),
+    ("Grace Hopper", "3000", "Navy"),
+    ("Edsger Dijkstra", "2000", ""),
+]
+
+
+@pytest.fixture
+def high_impact(output_dir):
+    with open(output_dir / "high_impact_citing_authors.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, ["Citing Author Name", "Citing Author Profile", "Citing Author Affiliation",
+                                    "Citing Author Total Citations", "Citing Author h-index", "Citing Paper Title"])
+        writer.writeheader()
+        for name, citations, affiliation in AUTHORS:
+            writer.writerow({
+                "Citing Author Name": name,
+                "Citing Author Profile": f"https://www.semanticscholar.org/author/{name.split()[1]}",
+                "Citing Author Affiliation": affiliation,
+                "Citing Author Total Citations": citations,
+                "Citing Author h-index": "10",
+                "Citing Paper Title": "Some Paper",
+            })
+    return output_dir
+
+
+def read_enriched(output_dir):
+    with open(output_dir / "high_impact_authors_enriched.csv", newline="", encoding="utf-8") as f:
+        return {row["name"]: row for row in csv.DictReader(f)}
+
+
+def research(*args):
+    result = CliRunner().invoke(cli, ["research", "--backend", "fake", *args])
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+def test_parse_research_response():
+    ok = '{"name": " Ada ", "affiliation": "X", "title": "Prof", "link": "https://a.b"}'
+    assert parse_research_response(ok) == ({"name": "Ada", "affiliation": "X", "title": "Prof",
+                                            "link": "https://a.b"}, None)
+    assert parse_research_response("Sure! ```json\n" + ok + "\n```")[0]["name"] == "Ada"
+    assert parse_research_response("")[1] == "empty response"
+    assert parse_research_response("no json here")[1] == "no JSON object in response"
+    assert parse_research_response("{oops}")[1] == "malformed JSON"
+    assert parse_research_response('{"name": "Ada"}')[1] == "missing fields: affiliation, title, link"
+    relative = '{"name": "Ada", "affiliation": "", "title": "", "link": "/people/ada"}'
+    assert parse_research_response(relative)[0]["link"] == ""
+
+
+def test_research_with_fake_backend(high_impact):
+    output = research()
+    rows = read_enriched(high_impact)
+    assert set(rows) == {name for name, _, _ in AUTHORS}
+    assert all(row["Research Status"] == "ok" and row["Researched At"] for row in rows.values())
+    assert all(int(row["Input Tokens"]) > 0 for row in rows.values())
+    assert "4 requests" in output
+
+    # A second run reuses every fresh result instead of asking again
+    assert "4 reused from earlier research" in research()
+
+
+def test_input_budget_researches_most_valuable_first(high_impact):
+    # Each prompt is roughly 200 tokens, so two fit
+    output = research("--max-input-tokens", "450")
+    assert "Budget exhausted: skipped 2" in output
+    # Authors without a known affiliation have the most to gain
+    assert set(read_enriched(high_impact)) == {"Alan Turing", "Edsger Dijkstra"}
+
+
+def test_invalid_output_is_retried_then_queued(high_impact, monkeypatch):
+    calls = {}
+    research_one = FakeBackend.research
+
+    def flaky(self, prompt, schema=None):
+        name = "Grace Hopper" if "Grace Hopper" in prompt else "Alan Turing" if "Alan Turing" in prompt else None
+        calls[name] = calls.get(name, 0) + 1
+        if name == "Grace Hopper" and calls[name] == 1:
+            return BackendResponse(text="I could not find JSON", input_tokens=10)
+        if name == "Alan Turing":
+            return BackendResponse(text='{"name": "Alan Turing"}', input_tokens=10)
+        return research_one(self, prompt, schema)
+
+    monkeypatch.setattr(FakeBackend, "research", flaky)
+    output = research("--max-retries", "1")
+    assert calls["Grace Hopper"] == 2 and calls["Alan Turing"] == 2
+    rows = read_enriched(high_impact)
+    assert rows["Grace Hopper"]["Research Status"] == "ok"
+    assert rows["Alan Turing"]["Research Status"].startswith("invalid: missing fields")
+    assert "1 authors are queued for `whocite retry`" in output
+    assert list(load_queue()) == ["research:https://www.semanticscholar.org/author/Turing"]
+
+    # Once the backend answers properly, `whocite retry` recovers just that author
+    monkeypatch.setattr(FakeBackend, "research", research_one)
+    monkeypatch.setattr(retry_queue.time, "sleep", lambda seconds: None)
+    result = CliRunner().invoke(cli, ["retry", "--kind", "research"])
+    assert result.exit_code == 0, result.output
+    assert "Recovered 1/1 research units" in result.output
+    assert read_enriched(high_impact)["Alan Turing"]["Research Status"] == "ok"
+    assert load_queue() == {}
+
+
+def test_backend_errors_are_queued(high_impact, monkeypatch):
+    def broken(self, prompt, schema=None):
+        raise ConnectionError("provider down")
+
+    monkeypatch.setattr(FakeBackend, "research", broken)
+    research()
+    queue = load_queue()
+    assert len(queue) == len(AUTHORS)
+    assert all(unit["error"] == "ConnectionError" and unit["payload"]["backend"] == "fake" for unit in queue.values())
+
+
+def test_reasks_that_run_out_of_budget_are_queued(high_impact, monkeypatch):
+    research_one = FakeBackend.research
+
+    def invalid(self, prompt, schema=None):
+        response = research_one(self, prompt, schema)
+        return BackendResponse(text="no answer", input_tokens=response.input_tokens)
+
+    monkeypatch.setattr(FakeBackend, "research", invalid)
+    # Room for the two most valuable authors once, but not for asking them again
+    output = research("--max-input-tokens", "450", "--max-retries", "1")
+    rows = read_enriched(high_impact)
+    assert set(rows) == {"Alan Turing", "Edsger Dijkstra"}
+    assert set(load_queue()) == {
+        "research:https://www.semanticscholar.org/author/Turing",
+        "research:https://www.semanticscholar.org/author/Dijkstra",
+    }
+    assert "2 authors still lack valid research" in output
+    assert "2 authors are queued for `whocite retry`" in output
+    assert "skipped 2 lower-ranked authors" in output
+
+
+def test_max_cost_without_prices_refuses_to_run(high_impact):
+    output = research("--max-cost", "0.0001")
+    assert "--max-cost needs input_cost_per_million" in output
+    assert not (high_impact / "high_impact_authors_enriched.csv").exists()
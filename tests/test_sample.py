@@ -0,0 +1,40 @@
+from whocite.artifacts import save_citations
+from whocite.retry_queue import record_failure
+from whocite.sample import stratified_sample
+from whocite.step1_fetch_citations import load_reusable
+
+
+def test_stratified_sample_covers_every_band():
+    items = list(range(100))
+    sample = stratified_sample(items, 0.1, key=lambda i: i)
+    assert len(sample) == 10
+    assert sample == sorted(sample)
+    # Five bands of 20 items, two picks from each
+    for band in range(5):
+        assert sum(1 for i in sample if band * 20 <= i < (band + 1) * 20) == 2
+
+
+def test_stratified_sample_takes_at_least_one_per_band():
+    sample = stratified_sample(list(range(10)), 0.01, key=lambda i: i)
+    assert len(sample) == 5
+
+
+def test_stratified_sample_of_everything():
+    assert stratified_sample([3, 1, 2], 1.0, key=lambda i: i) == [3, 1, 2]
+
+
+def plan_item(doi, count):
+    return {"paper": {"doi": doi, "title": doi}, "citation_count": count, "pages": 1}
+
+
+def test_reuse_needs_matching_count_and_no_queued_failure(output_dir):
+    save_citations([
+        {"my_paper": {"doi": "10.1/same"}, "citation_count": 5, "citations": []},
+        {"my_paper": {"doi": "10.1/grew"}, "citation_count": 5, "citations": []},
+        {"my_paper": {"doi": "10.1/failed"}, "citation_count": 5, "citations": []},
+        {"my_paper": {"doi": "10.1/legacy"}, "citations": []},
+    ])
+    record_failure("citations", "DOI:10.1/failed", ValueError("boom"), {"offset": 0})
+    plan = [plan_item("10.1/same", 5), plan_item("10.1/grew", 6), plan_item("10.1/failed", 5),
+            plan_item("10.1/legacy", 5), plan_item("10.1/new", 5)]
+    assert list(load_reusable(plan)) == ["DOI:10.1/same"]
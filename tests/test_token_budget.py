@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+from whocite.research_backends import GeminiBackend
+from whocite.token_budget import TokenBudget
+
+
+def test_input_budget_refuses_requests_past_the_limit():
+    budget = TokenBudget(max_input_tokens=100)
+    assert budget.try_reserve(60)
+    assert not budget.try_reserve(60)
+    budget.record(60, 50, 10)
+    assert budget.try_reserve(50)
+    assert not budget.try_reserve(1)
+
+
+def test_release_returns_the_reservation():
+    budget = TokenBudget(max_input_tokens=100)
+    assert budget.try_reserve(100)
+    budget.release(100)
+    assert budget.try_reserve(100)
+    assert budget.requests == 0
+
+
+def test_missing_usage_is_charged_at_the_estimate():
+    budget = TokenBudget()
+    budget.try_reserve(40)
+    budget.record(40, None, None)
+    assert (budget.input_tokens, budget.output_tokens, budget.requests) == (40, 0, 1)
+
+
+def test_cost_check_counts_expected_output_of_requests_in_flight():
+    # $1 per million input and $10 per million output tokens
+    budget = TokenBudget(max_cost=0.03, input_cost_per_million=1, output_cost_per_million=10,
+                         expected_output_tokens=1000)
+    # Each request: ~$0.001 input + ~$0.01 expected output
+    assert budget.try_reserve(1000)
+    assert budget.try_reserve(1000)
+    assert not budget.try_reserve(1000)
+
+
+def test_cost_check_switches_to_mean_output_once_known():
+    budget = TokenBudget(max_cost=0.03, input_cost_per_million=1, output_cost_per_million=10,
+                         expected_output_tokens=1000)
+    budget.try_reserve(1000)
+    budget.record(1000, 1000, 100)
+    # Mean output is now 100 tokens (~$0.001), so several more requests fit
+    for _ in range(5):
+        assert budget.try_reserve(1000)
+
+
+def test_gemini_usage_includes_thinking_and_search_tokens():
+    usage = SimpleNamespace(prompt_token_count=100, candidates_token_count=20,
+                            thoughts_token_count=300, tool_use_prompt_token_count=50)
+    response = SimpleNamespace(candidates=[], usage_metadata=usage)
+    result = GeminiBackend._to_response(response)
+    assert (result.input_tokens, result.output_tokens) == (150, 320)
+
+
+def test_gemini_usage_without_optional_counts():
+    usage = SimpleNamespace(prompt_token_count=100, candidates_token_count=20,
+                            thoughts_token_count=None, tool_use_prompt_token_count=None)
+    response = SimpleNamespace(candidates=[], usage_metadata=usage)
+    result = GeminiBackend._to_response(response)
+    assert (result.input_tokens, result.output_tokens) == (100, 20)
@@ -0,0 +1,86 @@
+import pytest
+import requests
+
+from whocite import step1_fetch_citations as step1
+from whocite import watch
+from whocite.artifacts import iter_citations, save_citations
+from whocite.retry_queue import load_queue
+from whocite.session import session
+
+COUNTS = {"10.1/a": 500, "10.1/b": 1500}
+
+
+class Response:
+    def __init__(self, payload):
+        self.payload = payload
+        self.status_code = 200
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def semantic_scholar(output_dir, monkeypatch):
+    """Fake Semantic Scholar; set `broken` to an offset to fail that page of 10.1/b."""
+    api = {"pages": [], "broken": None}
+
+    def post(url, params=None, json=None, headers=None, timeout=None):
+        return Response([{"paperId": "S" + ref, "citationCount": COUNTS[ref[4:]]} for ref in json["ids"]])
+
+    def get(url, params=None, headers=None, timeout=None):
+        doi = url.split("DOI:")[1].split("/citations")[0].replace("%2F", "/")
+        offset = params["offset"]
+        if doi == "10.1/b" and offset == api["broken"]:
+            raise requests.exceptions.ConnectionError("connection reset")
+        api["pages"].append((doi, offset))
+        end = min(COUNTS[doi], offset + params["limit"])
+        data = [{"citingPaper": {"title": f"{doi}-{i}", "authors": []}} for i in range(offset, end)]
+        return Response({"data": data, "next": end} if end < COUNTS[doi] else {"data": data})
+
+    monkeypatch.setattr(session, "post", post)
+    monkeypatch.setattr(session, "get", get)
+    monkeypatch.setattr(watch.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(step1, "load_papers_from_bib",
+                        lambda: [{"doi": doi, "title": doi} for doi in COUNTS])
+    return api
+
+
+def stored_counts():
+    return {entry["my_paper"]["doi"]: len(entry["citations"]) for entry in iter_citations()}
+
+
+def test_partial_fetch_is_retried_next_cycle(semantic_scholar):
+    state = {"papers": {}}
+    semantic_scholar["broken"] = 1000
+    assert watch.refresh_citations(None, state)
+    assert stored_counts() == {"10.1/a": 500, "10.1/b": 1000}
+    assert "citations:DOI:10.1/b" in load_queue()
+    assert "DOI:10.1/b" not in state["papers"]
+
+    # The count has not moved, but the queued page makes the paper due again
+    semantic_scholar["broken"] = None
+    semantic_scholar["pages"].clear()
+    assert watch.refresh_citations(None, state)
+    assert {doi for doi, _ in semantic_scholar["pages"]} == {"10.1/b"}
+    assert stored_counts() == {"10.1/a": 500, "10.1/b": 1500}
+    assert load_queue() == {}
+    assert state["papers"]["DOI:10.1/b"]["citation_count"] == 1500
+
+
+def test_first_cycle_after_run_all_reuses_stored_counts(semantic_scholar):
+    save_citations([
+        {"my_paper": {"doi": "10.1/a"}, "citation_count": 500, "citations": [{}] * 500},
+        {"my_paper": {"doi": "10.1/b"}, "citation_count": 1400, "citations": [{}] * 1400},
+    ])
+    state = {"papers": {}}
+    assert watch.refresh_citations(None, state)
+    # Only the paper whose count moved since step 1 is fetched again
+    assert {doi for doi, _ in semantic_scholar["pages"]} == {"10.1/b"}
+    assert set(state["papers"]) == {"DOI:10.1/a", "DOI:10.1/b"}
+
+    semantic_scholar["pages"].clear()
+    assert not watch.refresh_citations(None, state)
+    assert semantic_scholar["pages"] == []